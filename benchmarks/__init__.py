@@ -0,0 +1 @@
+"""Performance benchmarks for the unoptimization recipe and executors."""
@@ -0,0 +1,341 @@
+"""Reproducible performance benchmarks for the recipe and the executors.
+
+Run the suite and save the results as JSON:
+
+    python -m benchmarks.suite --output results.json
+
+Compare against an earlier run, flagging benchmarks that got slower by more than the threshold:
+
+    python -m benchmarks.suite --output new.json --compare results.json --threshold 0.2
+
+Every circuit, recipe run and simulation is seeded, so two runs on the same machine time the same work.
+"""
+
+import argparse
+import functools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from importlib.metadata import version
+from typing import Any
+
+import networkx as nx
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit.library import QuantumVolume
+from qiskit_aer import AerSimulator
+
+from unopt.benchmark import bench
+from unopt.circuit import generate_random_two_qubit_gate_circuit, super_peaked_entangled_circuit
+from unopt.noise import depolarizing_noise_model
+from unopt.qaoa import measure_sample_cuts
+from unopt.qem import execute, execute_no_shot_noise
+from unopt.qv import get_exact_hop
+from unopt.recipe import unoptimize_circuit
+from unopt.simulators import SIMULATION_METHODS, select_method
+
+SEED = 1234
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing and memory of one benchmark case.
+
+    `seconds` is the median wall time of one call over `repeats` calls. `circuits_per_second` counts the circuits one
+    call produces or executes, and `seconds_per_iteration` divides the time by the recipe iterations, where those
+    apply. `peak_memory` is the `tracemalloc` peak of one extra, untimed call.
+    """
+
+    benchmark: str
+    params: dict[str, Any]
+    seconds: float
+    repeats: int
+    circuits_per_second: float | None = None
+    seconds_per_iteration: float | None = None
+    peak_memory: int | None = None
+
+
+@dataclass
+class BenchmarkCase:
+    """A function to benchmark, with the parameters reported alongside it."""
+
+    benchmark: str
+    params: dict[str, Any]
+    run: Callable[[], Any]
+    circuits: int | None = None
+    iterations: int | None = None
+    repeats: int = 3
+
+
+def measure(case: BenchmarkCase) -> BenchmarkResult:
+    """Run a case once to warm up, `repeats` times for timing, and once under `tracemalloc`."""
+    case.run()
+    timings = []
+    for _ in range(case.repeats):
+        start = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - start)
+    seconds = statistics.median(timings)
+
+    tracemalloc.start()
+    try:
+        case.run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        benchmark=case.benchmark,
+        params=case.params,
+        seconds=seconds,
+        repeats=case.repeats,
+        circuits_per_second=case.circuits / seconds if case.circuits else None,
+        seconds_per_iteration=seconds / case.iterations if case.iterations else None,
+        peak_memory=peak_memory,
+    )
+
+
+def quantum_volume_circuit(num_qubits: int) -> QuantumCircuit:
+    """Return a seeded quantum volume circuit in the `cx`/`u3` basis."""
+    qc = QuantumVolume(num_qubits, seed=SEED).decompose()
+    return transpile(qc, basis_gates=["cx", "u3"], optimization_level=0, seed_transpiler=SEED)
+
+
+def random_circuit(num_qubits: int) -> QuantumCircuit:
+    """Return a seeded circuit from `generate_random_two_qubit_gate_circuit` of depth 5."""
+    random.seed(SEED)
+    return generate_random_two_qubit_gate_circuit(num_qubits, 5)
+
+
+def recipe_cases(quick: bool) -> Iterator[BenchmarkCase]:
+    """Yield `unoptimize_circuit` cases across circuits, strategies, decomposition methods and sizes."""
+    qubit_counts = [4, 6] if quick else [4, 6, 8, 10]
+    iteration_counts = [1, 3] if quick else [1, 3, 5]
+    for circuit_name, make_circuit in [("quantum_volume", quantum_volume_circuit), ("random", random_circuit)]:
+        for num_qubits in qubit_counts:
+            qc = make_circuit(num_qubits)
+            for strategy in ["concatenated", "random"]:
+                for decomposition_method in ["default", "kak", "basis", "direct"]:
+                    for iterations in iteration_counts:
+                        yield BenchmarkCase(
+                            benchmark="unoptimize_circuit",
+                            params={
+                                "circuit": circuit_name,
+                                "num_qubits": num_qubits,
+                                "strategy": strategy,
+                                "decomposition_method": decomposition_method,
+                                "iterations": iterations,
+                            },
+                            run=functools.partial(
+                                unoptimize_circuit,
+                                qc,
+                                iterations=iterations,
+                                strategy=strategy,
+                                decomposition_method=decomposition_method,
+                                seed=SEED,
+                            ),
+                            circuits=1,
+                            iterations=iterations,
+                        )
+
+
+def executor_cases(quick: bool) -> Iterator[BenchmarkCase]:
+    """Yield cases for the executors, `bench`, `get_exact_hop` and `measure_sample_cuts`."""
+    qubit_counts = [2, 4] if quick else [2, 4, 6, 8]
+    noise_model = depolarizing_noise_model(error=0.01)
+    backend = AerSimulator(seed_simulator=SEED)
+    for num_qubits in qubit_counts:
+        qc = quantum_volume_circuit(num_qubits)
+        yield BenchmarkCase(
+            benchmark="execute",
+            params={"num_qubits": num_qubits, "shots": 10_000, "noise_model": "depolarizing"},
+            run=functools.partial(execute, qc, backend, shots=10_000, noise_model=noise_model),
+            circuits=1,
+        )
+        yield BenchmarkCase(
+            benchmark="execute_no_shot_noise",
+            params={"num_qubits": num_qubits, "noise_model": "depolarizing"},
+            run=functools.partial(execute_no_shot_noise, qc, noise_model=noise_model),
+            circuits=1,
+        )
+        yield BenchmarkCase(
+            benchmark="get_exact_hop",
+            params={"num_qubits": num_qubits},
+            run=functools.partial(get_exact_hop, qc),
+            circuits=1,
+        )
+
+    for num_nodes in [6, 12] if quick else [6, 12, 18, 24]:
+        graph = nx.random_regular_graph(3, num_nodes, seed=SEED)
+        outcomes = np.random.default_rng(SEED).integers(2, size=(10_000, num_nodes))
+        counts: dict[str, int] = {}
+        for outcome in outcomes:
+            bitstring = "".join(map(str, outcome))
+            counts[bitstring] = counts.get(bitstring, 0) + 1
+        yield BenchmarkCase(
+            benchmark="measure_sample_cuts",
+            params={"num_nodes": num_nodes, "shots": 10_000, "distinct_outcomes": len(counts)},
+            run=functools.partial(measure_sample_cuts, counts, graph),
+        )
+
+    # Every trial executes the unmitigated circuit and three folded and three unoptimized circuits.
+    trials = 1 if quick else 3
+    qc = quantum_volume_circuit(4)
+    yield BenchmarkCase(
+        benchmark="bench",
+        params={"num_qubits": qc.num_qubits, "shots": 1_000, "trials": trials},
+        run=functools.partial(
+            bench, qc, backend=backend, noise_model=noise_model, shots=1_000, trials=trials, seed=SEED
+        ),
+        circuits=7 * trials,
+        repeats=1,
+    )
+
+
+def rotated_chain_circuit(num_qubits: int) -> QuantumCircuit:
+    """Return a weakly entangled, non-Clifford chain of CNOTs between rotations in the `cx`/`u3` basis."""
+    qc = QuantumCircuit(num_qubits)
+    for qubit in range(num_qubits):
+        qc.ry(0.1 * (qubit + 1), qubit)
+    for qubit in range(num_qubits - 1):
+        qc.cx(qubit, qubit + 1)
+        qc.rz(0.2, qubit + 1)
+    return transpile(qc, basis_gates=["cx", "u3"], optimization_level=0)
+
+
+def method_cases(quick: bool) -> Iterator[BenchmarkCase]:
+    """Yield cases timing every simulation method that can run a circuit, with the method `select_method` picks.
+
+    GHZ circuits are Clifford and weakly entangled, rotated chains are weakly entangled only, and quantum volume
+    circuits are neither. Methods are skipped where they cannot apply or would not finish: the stabilizer method on
+    non-Clifford circuits, density matrices beyond 10 qubits, statevectors beyond 24 qubits and matrix product states
+    on quantum volume circuits beyond 12 qubits.
+    """
+    noise_model = depolarizing_noise_model(error=0.01)
+    circuits: list[tuple[str, Callable[[int], QuantumCircuit], list[int]]] = [
+        ("ghz", super_peaked_entangled_circuit, [8, 20] if quick else [8, 16, 24, 32]),
+        ("rotated_chain", rotated_chain_circuit, [8, 20] if quick else [8, 16, 24, 32]),
+        ("quantum_volume", quantum_volume_circuit, [8] if quick else [8, 12, 16]),
+    ]
+    for circuit_name, make_circuit, qubit_counts in circuits:
+        for num_qubits in qubit_counts:
+            qc = make_circuit(num_qubits)
+            for noisy in [False, True]:
+                selected = select_method(qc, noise_model=noise_model if noisy else None).method
+                for method in SIMULATION_METHODS:
+                    if (
+                        (method == "stabilizer" and circuit_name != "ghz")
+                        or (method == "density_matrix" and num_qubits > 10)
+                        or (method == "statevector" and num_qubits > 24)
+                        or (method == "matrix_product_state" and circuit_name == "quantum_volume" and num_qubits > 12)
+                        # Only the density matrix method gives exact noisy values.
+                        or (noisy and method != "density_matrix")
+                    ):
+                        continue
+                    yield BenchmarkCase(
+                        benchmark="simulation_method",
+                        params={
+                            "circuit": circuit_name,
+                            "num_qubits": num_qubits,
+                            "noise_model": "depolarizing" if noisy else None,
+                            "method": method,
+                            "selected": method == selected,
+                        },
+                        run=functools.partial(
+                            execute_no_shot_noise, qc, noise_model=noise_model if noisy else None, method=method
+                        ),
+                        circuits=1,
+                    )
+
+
+def run_suite(quick: bool = False, only: str | None = None) -> dict[str, Any]:
+    """Run every benchmark case and return the results with metadata about the environment.
+
+    Args:
+        quick: Whether to run a smaller grid of sizes, e.g. for a smoke test.
+        only: If given, only run benchmarks whose name contains this string.
+
+    Returns:
+        A JSON-serializable dict with "metadata" and "results".
+    """
+    results = []
+    for case in [*recipe_cases(quick), *executor_cases(quick), *method_cases(quick)]:
+        if only is not None and only not in case.benchmark:
+            continue
+        result = measure(case)
+        print(f"{result.benchmark} {result.params}: {result.seconds * 1e3:.2f} ms", file=sys.stderr)
+        results.append(asdict(result))
+
+    metadata = {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "packages": {name: version(name) for name in ["qiskit", "qiskit-aer", "numpy", "mitiq"]},
+        "seed": SEED,
+        "quick": quick,
+    }
+    return {"metadata": metadata, "results": results}
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Return a line for every benchmark that is slower than in `baseline` by more than `threshold`.
+
+    Args:
+        current: The results of the current run.
+        baseline: The results of an earlier run.
+        threshold: The tolerated relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        One description per regression.
+    """
+
+    def key(result: dict[str, Any]) -> str:
+        return json.dumps([result["benchmark"], result["params"]], sort_keys=True)
+
+    baseline_seconds = {key(result): result["seconds"] for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = baseline_seconds.get(key(result))
+        if before is not None and result["seconds"] > before * (1 + threshold):
+            regressions.append(
+                f"{result['benchmark']} {result['params']}: {before * 1e3:.2f} ms -> {result['seconds'] * 1e3:.2f} ms"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="Path of the JSON file to write the results to.")
+    parser.add_argument("--quick", action="store_true", help="Run a smaller grid of sizes.")
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this string.")
+    parser.add_argument("--compare", help="Path of an earlier JSON results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Tolerated relative slowdown (default 0.2).")
+    args = parser.parse_args()
+
+    # Extrapolation and skipped-insertion warnings are expected for some cases and would drown the progress output.
+    warnings.simplefilter("ignore")
+
+    results = run_suite(quick=args.quick, only=args.only)
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
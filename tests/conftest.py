@@ -38,10 +38,10 @@ def reset_random_seed(request):
     This fixture automatically runs before each test to ensure reproducible results
     when using random circuit generation and random unitary matrices.
 
-    Note: The test_recipe.py tests with strategy='random' have shown occasional
-    flakiness due to specific random states exposing edge cases in the quantum
-    circuit unoptimization algorithm. This seed reset helps make tests deterministic
-    while we investigate the root cause.
+    Note: The test_recipe.py tests with strategy='random' used to be flaky because
+    level 2/3 transpilation elided SWAP-like gates into a final layout permutation
+    that `synthesize` dropped. `synthesize` now keeps those gates, so the seed reset
+    is only needed for reproducible random circuits.
     """
     # Use a fixed seed for all tests to ensure complete determinism
     # Using test name hash caused issues with pytest running same test multiple times
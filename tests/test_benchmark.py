@@ -0,0 +1,123 @@
+"""Tests for the ZNE benchmarking functions."""
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+from mitiq import zne
+from qiskit import QuantumCircuit
+
+from unopt import benchmark
+from unopt.benchmark import bench, load_bench_results
+from unopt.qem import execute_no_shot_noise
+
+
+@pytest.fixture
+def bench_circuit() -> QuantumCircuit:
+    """A small circuit of single-qubit rotations and CNOTs."""
+    qc = QuantumCircuit(3)
+    for qubit in range(3):
+        qc.ry(0.3 * (qubit + 1), qubit)
+    qc.cx(0, 1)
+    qc.cx(1, 2)
+    qc.cx(0, 2)
+    return qc
+
+
+def test_bench_stores_density_matrices_on_request(bench_circuit: QuantumCircuit) -> None:
+    """Test that trials keep the density matrix only when asked to."""
+    results = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], seed=1)
+    assert results.trial_results[0].density_matrix is None
+
+    results = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], seed=1, store_density_matrices=True)
+    density_matrix = results.trial_results[0].density_matrix
+    assert density_matrix is not None and density_matrix.shape == (8, 8)
+    assert results.trial_results[0].ideal_value == pytest.approx(density_matrix[0, 0].real)
+
+
+def test_bench_computes_trial_invariants_once(bench_circuit: QuantumCircuit, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the ideal value is computed once, and that non-deterministic folding is redone every trial."""
+    ideal_calls = []
+
+    def counting_execute_no_shot_noise(*args: Any, **kwargs: Any) -> tuple[float, np.ndarray | None]:
+        ideal_calls.append(args)
+        return execute_no_shot_noise(*args, **kwargs)
+
+    fold_calls = []
+
+    def counting_fold(qc: QuantumCircuit, scale_factor: float) -> QuantumCircuit:
+        fold_calls.append(scale_factor)
+        return zne.scaling.fold_global(qc, scale_factor)
+
+    monkeypatch.setattr(benchmark, "execute_no_shot_noise", counting_execute_no_shot_noise)
+    results = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], trials=3, seed=1)
+    assert len(ideal_calls) == 1
+    assert len({trial.ideal_value for trial in results.trial_results}) == 1
+    assert len({tuple(trial.zne_fold_depths) for trial in results.trial_results}) == 1
+
+    bench(bench_circuit, shots=100, iterations_unopt=[1, 2], fold_method=counting_fold, trials=3, seed=1)
+    assert fold_calls == [1, 3, 5] * 3
+
+
+def test_bench_is_reproducible_in_parallel(bench_circuit: QuantumCircuit) -> None:
+    """Test that parallel trials give exactly the results of serial trials with the same seed."""
+    serial = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], trials=3, seed=7)
+    parallel = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], trials=3, seed=7, max_workers=2)
+    assert parallel == serial
+    assert [trial.trial_number for trial in parallel.trial_results] == [1, 2, 3]
+    # The trials are independent, so their unoptimized circuits differ.
+    assert len({trial.zne_unopt_value for trial in serial.trial_results}) > 1
+
+    with pytest.raises(ValueError, match="trials"):
+        bench(bench_circuit, trials=0)
+
+
+def test_bench_seeds_random_folding(bench_circuit: QuantumCircuit) -> None:
+    """Test that random gate folding is seeded per trial, so it is reproducible serially and in parallel."""
+    kwargs: dict[str, Any] = {
+        "shots": 100,
+        "iterations_unopt": [1, 2],
+        "fold_method": zne.scaling.fold_gates_at_random,
+        "scale_factors_zne": [1.0, 1.5, 2.0],
+        "trials": 3,
+        "seed": 5,
+    }
+    serial = bench(bench_circuit, **kwargs)
+    assert bench(bench_circuit, **kwargs) == serial
+    assert bench(bench_circuit, max_workers=2, **kwargs) == serial
+
+
+def test_bench_resumes_from_store(
+    bench_circuit: QuantumCircuit, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a stored run resumes with the remaining trials and equals an uninterrupted run."""
+    uninterrupted = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], trials=4, seed=3)
+
+    bench(bench_circuit, shots=100, iterations_unopt=[1, 2], trials=2, seed=3, store=tmp_path)
+    trial_calls = []
+
+    def counting_bench_trial(job: tuple) -> dict[str, Any]:
+        trial_calls.append(job[0])
+        return run_bench_trial(job)
+
+    run_bench_trial = benchmark._bench_trial
+    monkeypatch.setattr(benchmark, "_bench_trial", counting_bench_trial)
+    resumed = bench(bench_circuit, shots=100, iterations_unopt=[1, 2], trials=4, seed=3, store=tmp_path)
+    assert trial_calls == [2, 3]
+    assert resumed == uninterrupted
+    assert load_bench_results(tmp_path) == uninterrupted
+    assert load_bench_results(tmp_path, trials=2).trial_results == uninterrupted.trial_results[:2]
+
+    with pytest.raises(ValueError, match="different configuration"):
+        bench(bench_circuit, shots=200, iterations_unopt=[1, 2], trials=4, seed=3, store=tmp_path)
+
+
+def test_load_bench_results_shares_stored_density_matrix(bench_circuit: QuantumCircuit, tmp_path: Path) -> None:
+    """Test that a stored density matrix is loaded once, memory-mapped, for every trial."""
+    results = bench(
+        bench_circuit, shots=100, iterations_unopt=[1, 2], trials=2, seed=1, store_density_matrices=True, store=tmp_path
+    )
+    first, second = (trial.density_matrix for trial in results.trial_results)
+    assert isinstance(first, np.memmap) and first is second
+    assert results.trial_results[0].ideal_value == pytest.approx(first[0, 0].real)
@@ -0,0 +1,81 @@
+"""Tests for the on-disk cache of unoptimized circuits."""
+
+import os
+from pathlib import Path
+
+import pytest
+from qiskit import QuantumCircuit
+
+from unopt import cache as cache_module
+from unopt.cache import CircuitCache, circuit_fingerprint
+from unopt.circuit import generate_random_two_qubit_gate_circuit
+from unopt.profiling import RecipeProfiler
+from unopt.recipe import unoptimize_circuit
+
+
+def test_circuit_fingerprint_is_structural() -> None:
+    """Test that the fingerprint ignores names but not gates."""
+    qc = generate_random_two_qubit_gate_circuit(4, 3)
+    renamed = qc.copy(name="renamed")
+    assert circuit_fingerprint(qc) == circuit_fingerprint(renamed)
+
+    renamed.h(0)
+    assert circuit_fingerprint(qc) != circuit_fingerprint(renamed)
+
+
+def test_circuit_cache_hits_and_misses(tmp_path: Path) -> None:
+    """Test that repeated calls are served from disk, also by a new cache on the same directory."""
+    qc = generate_random_two_qubit_gate_circuit(4, 4)
+    cache = CircuitCache(tmp_path)
+
+    first = cache.unoptimize_circuit(qc, iterations=2, seed=3)
+    second = cache.unoptimize_circuit(qc, iterations=2, seed=3)
+    cache.unoptimize_circuit(qc, iterations=2, seed=4)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert first == second == unoptimize_circuit(qc, iterations=2, seed=3)
+
+    reopened = CircuitCache(tmp_path)
+    assert reopened.unoptimize_circuit(qc, iterations=2, seed=4) == unoptimize_circuit(qc, iterations=2, seed=4)
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+    cache.unoptimize_circuit(qc, iterations=2)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_circuit_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Test that the cache stays within its size bound by dropping the least recently used entry."""
+    qc = generate_random_two_qubit_gate_circuit(4, 4)
+    cache = CircuitCache(tmp_path)
+    for seed in range(3):
+        cache.unoptimize_circuit(qc, seed=seed)
+    paths = {seed: tmp_path / f"{cache.key(qc, seed=seed, strategy='concatenated')}.qpy" for seed in range(4)}
+
+    # Make the order of use explicit: seed 1 is the oldest, seed 0 was just used.
+    for age, seed in enumerate([1, 2, 0]):
+        os.utime(paths[seed], ns=(age * 10**9, age * 10**9))
+
+    cache.max_bytes = cache.size()
+    cache.unoptimize_circuit(qc, seed=3)
+    assert cache.size() <= cache.max_bytes
+    assert not paths[1].exists()
+    assert paths[3].exists()
+
+
+def test_circuit_cache_ignores_verify_and_profiler(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that `verify` and `profiler` share the cached result, which a profiler records only on a miss."""
+    qc = generate_random_two_qubit_gate_circuit(4, 4)
+    cache = CircuitCache(tmp_path)
+    profiler = RecipeProfiler(trace_memory=False)
+    first = cache.unoptimize_circuit(qc, seed=1, profiler=profiler)
+    assert profiler.records
+
+    recorded = len(profiler.records)
+    assert cache.unoptimize_circuit(qc, seed=1, verify=True, profiler=profiler) == first
+    assert cache.unoptimize_circuit(qc, seed=1, verify=False) == first
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert len(profiler.records) == recorded
+
+    # A hit is still checked when `verify` is set.
+    monkeypatch.setattr(cache_module, "load_circuit", lambda payload: QuantumCircuit(4))
+    with pytest.raises(RuntimeError, match="not equivalent"):
+        cache.unoptimize_circuit(qc, seed=1, verify=True)
@@ -0,0 +1,69 @@
+"""Tests for the two-qubit gate index."""
+
+import pytest
+from qiskit import QuantumCircuit
+
+from unopt.circuit import generate_random_two_qubit_gate_circuit
+from unopt.gate_index import TwoQubitGateIndex
+
+
+def first_concatenated_pair(qc: QuantumCircuit) -> tuple[int, int] | None:
+    """Reference pairwise search for the first gate sharing exactly one qubit with a later gate."""
+    gates = [
+        (idx, {qc.find_bit(q).index for q in instruction.qubits})
+        for idx, instruction in enumerate(qc.data)
+        if len(instruction.qubits) == 2
+    ]
+    for i, (idx, qubits_i) in enumerate(gates):
+        for _, qubits_j in gates[i + 1 :]:
+            common = qubits_i & qubits_j
+            if len(common) == 1:
+                return idx, common.pop()
+    return None
+
+
+@pytest.mark.parametrize("num_qubits,depth", [(3, 2), (4, 5), (6, 10), (8, 3)])
+def test_concatenated_candidates_match_pairwise_search(num_qubits: int, depth: int) -> None:
+    """Test that the first indexed candidate matches the pairwise search."""
+    qc = generate_random_two_qubit_gate_circuit(num_qubits, depth)
+    index = TwoQubitGateIndex.from_circuit(qc)
+    candidates, shared = index.concatenated_candidates()
+
+    expected = first_concatenated_pair(qc)
+    assert expected is not None
+    assert (int(index.positions[candidates[0]]), int(shared[0])) == expected
+
+
+def test_concatenated_candidates_skip_repeated_pairs() -> None:
+    """Test that gates on the same pair of qubits are not treated as concatenated."""
+    qc = QuantumCircuit(3)
+    qc.cx(0, 1)
+    qc.cz(1, 0)
+    qc.h(2)
+    qc.cx(1, 2)
+
+    index = TwoQubitGateIndex.from_circuit(qc)
+    candidates, shared = index.concatenated_candidates()
+    assert index.positions[candidates].tolist() == [0, 1]
+    assert shared.tolist() == [1, 1]
+
+
+def test_splice_matches_rebuilt_index() -> None:
+    """Test that incremental updates agree with rebuilding the index from the edited circuit."""
+    qc = generate_random_two_qubit_gate_circuit(4, 4)
+    index = TwoQubitGateIndex.from_circuit(qc)
+
+    edited = QuantumCircuit(4)
+    for instruction in qc.data[:3]:
+        edited.append(instruction)
+    edited.ccx(0, 1, 2)
+    edited.cx(2, 3)
+    edited.h(0)
+    for instruction in qc.data[5:]:
+        edited.append(instruction)
+    index.splice(3, 5, [[0, 1, 2], [2, 3], [0]])
+
+    rebuilt = TwoQubitGateIndex.from_circuit(edited)
+    assert index.positions.tolist() == rebuilt.positions.tolist()
+    assert index.qubits.tolist() == rebuilt.qubits.tolist()
+    assert index.gates_on(2).tolist() == rebuilt.gates_on(2).tolist()
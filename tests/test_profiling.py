@@ -0,0 +1,44 @@
+"""Tests for the per-stage profiling of the recipe."""
+
+from unopt.circuit import generate_random_two_qubit_gate_circuit
+from unopt.profiling import RecipeProfiler
+from unopt.recipe import unoptimize_circuit
+
+
+def test_profiler_records_every_stage() -> None:
+    """Test that each iteration records its stages, with metrics of the working circuit."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+    profiler = RecipeProfiler()
+    result = unoptimize_circuit(sample_circuit, iterations=2, seed=1, profiler=profiler)
+
+    stages = ["insert", "swap", "decompose", "synthesize", "index"]
+    assert [(record.iteration, record.stage) for record in profiler.records] == [(1, s) for s in stages] + [
+        (2, s) for s in stages
+    ]
+    assert profiler.records[-1].depth == result.depth()
+    assert profiler.records[-1].gate_count == len(result)
+    assert all(record.wall_time >= 0 and record.peak_memory is not None for record in profiler.records)
+
+    columns = profiler.as_dict()
+    assert columns["stage"] == [record.stage for record in profiler.records]
+    assert set(profiler.total_times()) == set(stages)
+    assert result == unoptimize_circuit(sample_circuit, iterations=2, seed=1)
+
+
+def test_profiler_records_deferred_and_window_synthesis() -> None:
+    """Test the stages recorded with deferred synthesis and with window synthesis, without memory tracing."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+
+    deferred = RecipeProfiler(trace_memory=False)
+    unoptimize_circuit(sample_circuit, iterations=3, seed=1, synthesize_every=2, profiler=deferred)
+    assert [record.stage for record in deferred.records if record.iteration == 3] == [
+        "insert",
+        "swap",
+        "decompose",
+        "synthesize",
+    ]
+    assert all(record.peak_memory is None for record in deferred.records)
+
+    window = RecipeProfiler()
+    unoptimize_circuit(sample_circuit, iterations=1, seed=1, synthesis="window", profiler=window)
+    assert [record.stage for record in window.records] == ["insert", "swap", "synthesize_window"]
@@ -1,9 +1,23 @@
 """Tests for quantum error mitigation (QEM) functions."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+import pytest
 from qiskit import QuantumCircuit
+from qiskit.primitives import BitArray
 from qiskit_aer import AerSimulator
-from unopt.qem import execute, execute_no_shot_noise
+from qiskit_ibm_runtime import SamplerV2
+from unopt.qem import (
+    execute,
+    execute_adaptive,
+    execute_async,
+    execute_batch,
+    execute_batches,
+    execute_no_shot_noise,
+    z_expectation_values,
+)
 from unopt.noise import depolarizing_noise_model
 
 
@@ -36,3 +50,181 @@ def test_empty_circuit() -> None:
     # Test execute_no_shot_noise with updated return format.
     noiseless_result, _ = execute_no_shot_noise(qc)
     assert np.isclose(noiseless_result, 1.0), f"Unexpected result for empty circuit: {noiseless_result}"
+
+
+def test_execute_batch_matches_execute() -> None:
+    """Test that `execute_batch` returns one value per circuit, in order, as `execute` would."""
+    circuits = []
+    for num_x in range(3):
+        qc = QuantumCircuit(2)
+        for _ in range(num_x):
+            qc.x(0)
+        circuits.append(qc)
+    simulator = AerSimulator()
+
+    values = execute_batch(circuits, backend=simulator, shots=100)
+    assert values.shape == (3,)
+    assert np.allclose(values, [1.0, -1.0, 1.0])
+    assert np.allclose(values, [execute(qc, backend=simulator, shots=100) for qc in circuits])
+    assert execute_batch([], backend=simulator, shots=100).shape == (0,)
+
+
+def test_execute_batch_with_noise() -> None:
+    """Test that `execute_batch` applies the noise model to every circuit."""
+    qc = QuantumCircuit(2)
+    for _ in range(20):
+        qc.cx(0, 1)
+    values = execute_batch([qc, qc], AerSimulator(), shots=1000, noise_model=depolarizing_noise_model(error=0.1))
+    assert np.all(values < 1.0)
+
+
+def test_z_expectation_values_matches_counts() -> None:
+    """Test Z-string expectation values from packed bits against a computation on the counts."""
+    num_qubits = 11
+    qc = QuantumCircuit(num_qubits)
+    for qubit in range(num_qubits):
+        qc.ry(0.3 * (qubit + 1), qubit)
+    qc.cx(0, 10)
+    qc.cx(3, 9)
+    qc.measure_all()
+    bit_array = SamplerV2(AerSimulator(seed_simulator=7)).run([qc], shots=2000).result()[0].data.meas
+
+    bit_sets = [[0], [10], [0, 10], [3, 9], [], list(range(num_qubits))]
+    values = z_expectation_values(bit_array, bit_sets)
+    # The label acts on bits 0 and 10, like the third set of bits.
+    assert np.isclose(z_expectation_values(bit_array, ["Z" + "I" * 9 + "Z"])[0], values[2])
+
+    counts = bit_array.get_counts()
+    shots = sum(counts.values())
+    for bits, value in zip(bit_sets, values):
+        expected = (
+            sum(count * (-1) ** sum(int(outcome[::-1][bit]) for bit in bits) for outcome, count in counts.items())
+            / shots
+        )
+        assert np.isclose(value, expected)
+
+
+def test_z_expectation_values_rejects_invalid_observables() -> None:
+    """Test that observables outside of the measured bits are rejected."""
+    bit_array = BitArray.from_bool_array(np.zeros((4, 3), dtype=bool))
+    with pytest.raises(ValueError, match="outside"):
+        z_expectation_values(bit_array, [[3]])
+    with pytest.raises(ValueError, match="label"):
+        z_expectation_values(bit_array, ["ZX"])
+
+
+def test_execute_batch_with_observables() -> None:
+    """Test that `execute_batch` evaluates every observable on every circuit."""
+    qc = QuantumCircuit(2)
+    qc.x(1)
+    values = execute_batch([qc, QuantumCircuit(2)], AerSimulator(), shots=100, observables=["IZ", "ZI", [0, 1]])
+    assert values.shape == (2, 3)
+    assert np.allclose(values, [[1, -1, -1], [1, 1, 1]])
+
+
+@pytest.mark.parametrize("noisy", [False, True])
+def test_execute_no_shot_noise_matches_density_matrix(noisy: bool) -> None:
+    """Test that the value without the density matrix equals rho[0, 0] of the density matrix."""
+    qc = QuantumCircuit(3)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.ry(0.4, 2)
+    qc.cx(1, 2)
+    noise_model = depolarizing_noise_model(error=0.05) if noisy else None
+
+    value, rho = execute_no_shot_noise(qc, noise_model=noise_model)
+    expected, density_matrix = execute_no_shot_noise(qc, noise_model=noise_model, return_density_matrix=True)
+    assert rho is None
+    assert density_matrix is not None and density_matrix.shape == (8, 8)
+    assert np.isclose(value, expected)
+    assert np.isclose(expected, density_matrix[0, 0].real)
+
+
+def test_execute_async_matches_execute_batch() -> None:
+    """Test that `execute_async` returns the values of `execute_batch` and can be gathered."""
+    circuits = [QuantumCircuit(2), QuantumCircuit(2)]
+    circuits[1].x(0)
+    simulator = AerSimulator()
+
+    async def main() -> list[np.ndarray]:
+        return list(
+            await asyncio.gather(
+                execute_async(circuits, simulator, shots=100),
+                execute_async(circuits, simulator, shots=100, observables=["ZZ"]),
+                execute_async([], simulator, shots=100),
+            )
+        )
+
+    values, correlators, empty = asyncio.run(main())
+    assert np.allclose(values, execute_batch(circuits, simulator, shots=100))
+    assert np.allclose(correlators, [[1.0], [-1.0]])
+    assert empty.shape == (0,)
+
+
+def test_execute_batches() -> None:
+    """Test that `execute_batches` returns the values of every batch in order."""
+    batches = []
+    for num_x in range(4):
+        qc = QuantumCircuit(1)
+        for _ in range(num_x):
+            qc.x(0)
+        batches.append([qc, qc])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = execute_batches(
+            batches, AerSimulator(), shots=100, noise_model=depolarizing_noise_model(0.0), executor=executor
+        )
+    assert [result.tolist() for result in results] == [[1.0, 1.0], [-1.0, -1.0], [1.0, 1.0], [-1.0, -1.0]]
+
+    with pytest.raises(ValueError, match="max_concurrency"):
+        execute_batches(batches, AerSimulator(), shots=100, max_concurrency=0)
+
+
+def test_execute_adaptive_reaches_target_error() -> None:
+    """Test that adaptive execution stops once the standard error is below the target."""
+    qc = QuantumCircuit(1)
+    qc.ry(1.0, 0)
+    estimate = execute_adaptive(qc, AerSimulator(), target_error=0.01, initial_shots=500, seed=1)
+    assert estimate.converged
+    assert estimate.standard_error <= 0.01
+    # The variance is 1 - cos(1)^2, so about 7,100 shots reach the target.
+    assert 5_000 < estimate.shots < 10_000
+    assert estimate.value == pytest.approx(np.cos(1.0), abs=5 * estimate.standard_error)
+
+    again = execute_adaptive(qc, AerSimulator(), target_error=0.01, initial_shots=500, seed=1)
+    assert again == estimate
+
+
+def test_execute_adaptive_stops_early_and_at_the_cap() -> None:
+    """Test a zero-variance observable and the shot cap."""
+    estimate = execute_adaptive(QuantumCircuit(2), AerSimulator(), target_error=0.01, initial_shots=100)
+    assert isinstance(estimate.value, float)
+    assert (estimate.value, estimate.converged) == (1.0, True)
+    # The add-one variance of 100 equal shots still asks for more shots.
+    assert 0.0 < estimate.standard_error <= 0.01
+    assert estimate.shots > 100
+
+    qc = QuantumCircuit(2)
+    qc.h(1)
+    estimate = execute_adaptive(
+        qc, AerSimulator(), target_error=1e-4, observable="ZI", initial_shots=100, max_shots=1_000, seed=2
+    )
+    assert estimate.shots == 1_000
+    assert not estimate.converged
+
+    with pytest.raises(ValueError, match="target error"):
+        execute_adaptive(qc, AerSimulator(), target_error=0.0)
+    with pytest.raises(ValueError, match="initial_shots"):
+        execute_adaptive(qc, AerSimulator(), target_error=0.1, initial_shots=10, max_shots=5)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_execute_adaptive_does_not_stop_before_a_rare_outcome(seed: int) -> None:
+    """Test that a first chunk without the rare outcome does not end the estimate."""
+    # P(1) = 0.003, so <Z> = 0.994 and about 12,000 shots reach a standard error of 0.001.
+    qc = QuantumCircuit(1)
+    qc.ry(2 * np.arcsin(np.sqrt(0.003)), 0)
+    estimate = execute_adaptive(qc, AerSimulator(), target_error=0.001, initial_shots=100, seed=seed)
+    assert estimate.converged
+    assert estimate.shots > 10_000
+    assert estimate.value == pytest.approx(0.994, abs=5 * estimate.standard_error)
@@ -1,11 +1,30 @@
 """Tests for the components of the elementary recipe (ER)."""
 
+from collections.abc import Callable
+
+import numpy as np
 import pytest
 from qiskit import QuantumCircuit
-from qiskit.quantum_info import Operator
+from qiskit.quantum_info import Operator, random_unitary
 
 from unopt.circuit import generate_random_two_qubit_gate_circuit
-from unopt.recipe import decompose, unoptimize_circuit
+from unopt.gate_index import TwoQubitGateIndex
+from unopt.recipe import (
+    conjugate_unitaries,
+    decompose,
+    insert,
+    insert_many,
+    swap,
+    swap_many,
+    synthesize,
+    synthesize_window,
+    unoptimize_circuit,
+    unoptimize_ladder,
+    unoptimize_many,
+    unoptimize_to_scale,
+    unoptimize_to_scales,
+)
+from unopt.sampling import haar_random_unitaries
 
 
 @pytest.mark.parametrize(
@@ -17,6 +36,7 @@ from unopt.recipe import decompose, unoptimize_circuit
         ("random", 2, lambda: generate_random_two_qubit_gate_circuit(6, 10), "kak"),
         ("concatenated", 1, lambda: generate_random_two_qubit_gate_circuit(4, 5), "basis"),
         ("concatenated", 2, lambda: generate_random_two_qubit_gate_circuit(6, 10), "basis"),
+        ("random", 2, lambda: generate_random_two_qubit_gate_circuit(6, 10), "direct"),
     ],
 )
 def test_unoptimize_circuit_unitary_equivalence(
@@ -36,3 +56,237 @@ def test_unoptimize_circuit_unitary_equivalence(
         f"Unitary equivalence not maintained for strategy={strategy}, "
         f"iterations={iterations}, decomposition_method={decomposition_method}, circuit={sample_circuit}"
     )
+
+
+@pytest.mark.parametrize("inplace", [False, True])
+def test_insert_and_swap_splice_circuit(inplace: bool) -> None:
+    """Test that insert and swap splice gates into the circuit without changing its unitary."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+    original = sample_circuit.copy()
+    original_unitary = Operator(sample_circuit)
+
+    inserted_qc, B1_info = insert(sample_circuit, inplace=inplace)
+    assert len(inserted_qc) == len(original) + 2
+    assert (inserted_qc is sample_circuit) == inplace
+
+    swapped_qc = swap(inserted_qc, B1_info, inplace=inplace)
+    B1_idx = B1_info["index"]
+    assert len(swapped_qc) == len(original) + 2
+    assert swapped_qc.data[B1_idx].operation.num_qubits == 3
+    assert swapped_qc.data[B1_idx + 1] == original.data[B1_idx]
+    assert original_unitary.equiv(Operator(swapped_qc))
+
+    if not inplace:
+        assert sample_circuit == original
+
+
+def test_insert_samples_only_the_inserted_gate() -> None:
+    """Test that a standalone insert samples A as the first and only draw from its seed."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+    _, B1_info = insert(sample_circuit, seed=21)
+    assert np.allclose(B1_info["A"], haar_random_unitaries(1, 4, seed=21)[0])
+
+
+@pytest.mark.parametrize("strategy", ["concatenated", "random"])
+def test_insert_many_sites(strategy: str) -> None:
+    """Test that multi-site insertion places A† A after distinct B1 gates and keeps the unitary."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(5, 6)
+    original_unitary = Operator(sample_circuit)
+
+    inserted_qc, B1_infos = insert_many(sample_circuit, num_sites=4, strategy=strategy)
+    assert len(B1_infos) == 4
+    assert len(inserted_qc) == len(sample_circuit) + 8
+    for B1_info in B1_infos:
+        assert inserted_qc.data[B1_info["index"]].operation == B1_info["gate"]
+        assert inserted_qc.data[B1_info["index"] + 1].operation.label == r"$A^{\dagger}$"
+
+    swapped_qc = swap_many(inserted_qc, B1_infos)
+    assert original_unitary.equiv(Operator(swapped_qc))
+
+    processed_qc = unoptimize_circuit(sample_circuit, iterations=2, strategy=strategy, sites_per_iteration=3)
+    assert original_unitary.equiv(Operator(processed_qc))
+
+
+@pytest.mark.parametrize(
+    "B1_positions,A_dagger_positions",
+    [
+        ([0, 1], [1, 2]),
+        ([1, 0], [0, 2]),
+        ([2, 0], [2, 1]),
+        ([1, 2], [2, 0]),
+    ],
+)
+def test_conjugate_unitaries_matches_operator_products(B1_positions: list[int], A_dagger_positions: list[int]) -> None:
+    """Test the tensor contraction against explicit 8x8 operator products, with and without batching."""
+    B1_ops = [random_unitary(4) for _ in range(3)]
+    A_dagger_ops = [random_unitary(4) for _ in range(3)]
+
+    expected = []
+    for B1, A_dagger in zip(B1_ops, A_dagger_ops):
+        B1_full = Operator(np.eye(8)).compose(B1, qargs=B1_positions)
+        A_dagger_full = Operator(np.eye(8)).compose(A_dagger, qargs=A_dagger_positions)
+        expected.append(B1_full.adjoint().dot(A_dagger_full).dot(B1_full).data)
+
+    single = conjugate_unitaries(B1_ops[0].data, A_dagger_ops[0].data, B1_positions, A_dagger_positions)
+    assert np.allclose(single, expected[0])
+
+    batched = conjugate_unitaries(
+        np.stack([op.data for op in B1_ops]),
+        np.stack([op.data for op in A_dagger_ops]),
+        B1_positions,
+        A_dagger_positions,
+    )
+    assert np.allclose(batched, np.stack(expected))
+
+
+@pytest.mark.parametrize("strategy", ["concatenated", "random"])
+def test_unoptimize_circuit_is_reproducible_with_seed(strategy: str) -> None:
+    """Test that the same seed gives the same unoptimized circuit."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(5, 6)
+
+    first = unoptimize_circuit(sample_circuit, iterations=2, strategy=strategy, seed=123)
+    second = unoptimize_circuit(sample_circuit, iterations=2, strategy=strategy, seed=123)
+    assert first == second
+
+
+@pytest.mark.parametrize("decomposition_method", ["default", "kak", "basis", "direct"])
+def test_unoptimize_circuit_window_synthesis(decomposition_method: str) -> None:
+    """Test that window synthesis keeps the unitary and leaves gates outside the windows untouched."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(5, 6)
+    original_unitary = Operator(sample_circuit)
+
+    processed_qc = unoptimize_circuit(
+        sample_circuit,
+        iterations=3,
+        decomposition_method=decomposition_method,
+        sites_per_iteration=2,
+        seed=5,
+        synthesis="window",
+    )
+    assert original_unitary.equiv(Operator(processed_qc))
+
+    # Gates in front of the first B1 are never part of a window.
+    _, B1_infos = insert_many(sample_circuit, num_sites=1)
+    first_B1 = B1_infos[0]["index"]
+    assert processed_qc.data[:first_B1] == sample_circuit.data[:first_B1]
+
+
+def test_synthesize_window_splices_basis_gates() -> None:
+    """Test that a resynthesized window is in the cx/u3 basis and keeps the two-qubit gate index in sync."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 4)
+    index = TwoQubitGateIndex.from_circuit(sample_circuit)
+
+    processed_qc = synthesize_window(sample_circuit, 2, 6, index=index)
+    assert Operator(sample_circuit).equiv(Operator(processed_qc))
+    assert processed_qc.data[:2] == sample_circuit.data[:2]
+    assert processed_qc.data[len(processed_qc) - len(sample_circuit) + 6 :] == sample_circuit.data[6:]
+
+    rebuilt = TwoQubitGateIndex.from_circuit(processed_qc)
+    assert index.positions.tolist() == rebuilt.positions.tolist()
+    assert index.qubits.tolist() == rebuilt.qubits.tolist()
+
+
+def test_decompose_direct_emits_basis_gates() -> None:
+    """Test that the direct method synthesizes the recipe's unitaries into cx/u3 gates without changing the unitary."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+    inserted_qc, B1_info = insert(sample_circuit, seed=6)
+    swapped_qc = swap(inserted_qc, B1_info)
+
+    decomposed_qc = decompose(swapped_qc, method="direct")
+    assert "unitary" not in decomposed_qc.count_ops()
+    assert Operator(swapped_qc).equiv(Operator(decomposed_qc))
+
+
+def test_synthesize_keeps_swaps_equivalent() -> None:
+    """Test that synthesis does not turn SWAP gates into an unrecorded qubit permutation."""
+    qc = QuantumCircuit(3)
+    qc.h(0)
+    qc.swap(0, 2)
+    qc.cx(1, 2)
+
+    synthesized_qc = synthesize(qc)
+    assert set(synthesized_qc.count_ops()) <= {"cx", "u3"}
+    assert Operator(qc).equiv(Operator(synthesized_qc))
+
+
+def test_unoptimize_ladder_matches_repeated_runs() -> None:
+    """Test that each rung equals a fresh run with the same seed and iteration count."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(5, 6)
+
+    rungs = list(unoptimize_ladder(sample_circuit, [3, 0, 1, 3], seed=9))
+    assert [rung.iterations for rung in rungs] == [0, 1, 3]
+    assert rungs[0].circuit == sample_circuit
+
+    for rung in rungs:
+        assert rung.circuit == unoptimize_circuit(sample_circuit, iterations=rung.iterations, seed=9)
+        assert rung.depth == rung.circuit.depth()
+        assert rung.count_ops == dict(rung.circuit.count_ops())
+
+
+@pytest.mark.parametrize("synthesize_every,iterations", [(2, 3), (3, 3)])
+def test_unoptimize_circuit_deferred_synthesis(synthesize_every: int, iterations: int) -> None:
+    """Test that deferring synthesis keeps the unitary and yields a cx/u3 circuit, also for ladder rungs."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+
+    unoptimized_qc = unoptimize_circuit(
+        sample_circuit, iterations=iterations, seed=2, synthesize_every=synthesize_every
+    )
+    assert set(unoptimized_qc.count_ops()) <= {"cx", "u3"}
+    assert Operator(sample_circuit).equiv(Operator(unoptimized_qc))
+
+    rungs = unoptimize_ladder(sample_circuit, range(iterations + 1), seed=2, synthesize_every=synthesize_every)
+    for rung in rungs:
+        expected = unoptimize_circuit(
+            sample_circuit, iterations=rung.iterations, seed=2, synthesize_every=synthesize_every
+        )
+        assert rung.circuit == expected
+
+
+def test_unoptimize_circuit_rejects_deferred_window_synthesis() -> None:
+    """Test that window synthesis cannot be deferred."""
+    with pytest.raises(ValueError):
+        unoptimize_circuit(generate_random_two_qubit_gate_circuit(4, 5), synthesis="window", synthesize_every=2)
+
+
+def test_unoptimize_many_matches_serial_runs() -> None:
+    """Test that pooled results come back in order and match serial runs with the same seeds."""
+    circuits = [generate_random_two_qubit_gate_circuit(4, depth) for depth in (3, 4, 5)]
+    seeds = np.array([11, 12, 13])
+
+    # Run the transpiler in this process first: forked workers used to deadlock after it.
+    expected = [unoptimize_circuit(qc, iterations=2, seed=int(seed)) for qc, seed in zip(circuits, seeds)]
+    assert unoptimize_many(circuits, iterations=2, seeds=seeds, max_workers=2) == expected
+
+    assert unoptimize_many(circuits, seeds=5, max_workers=2) == unoptimize_many(circuits, seeds=5, max_workers=1)
+    with pytest.raises(ValueError):
+        unoptimize_many(circuits, seeds=np.array([1, 2]))
+
+
+@pytest.mark.parametrize("metric,measure", [("depth", QuantumCircuit.depth), ("gate_count", QuantumCircuit.size)])
+def test_unoptimize_to_scale_stops_at_first_rung_reaching_target(
+    metric: str, measure: Callable[[QuantumCircuit], int]
+) -> None:
+    """Test that the returned circuit is the first rung whose scale factor reaches the target."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+    baseline = measure(sample_circuit)
+
+    result = unoptimize_to_scale(sample_circuit, 3.0, metric=metric, tolerance=0.1, seed=4)
+    assert result.scale_factor == measure(result.circuit) / baseline
+    assert result.scale_factor >= 2.9
+    assert result.circuit == unoptimize_circuit(sample_circuit, iterations=result.iterations, seed=4)
+    previous = unoptimize_circuit(sample_circuit, iterations=result.iterations - 1, seed=4)
+    assert measure(previous) / baseline < 2.9
+
+
+def test_unoptimize_to_scales_covers_grid_in_one_run() -> None:
+    """Test that a grid of targets is served in input order and warns when a target is out of reach."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 5)
+
+    results = unoptimize_to_scales(sample_circuit, [3.0, 1.0, 2.0], seed=4)
+    assert [result.target_scale for result in results] == [3.0, 1.0, 2.0]
+    assert results[1].iterations == 0
+    assert results[1].iterations <= results[2].iterations <= results[0].iterations
+
+    with pytest.warns(UserWarning):
+        result = unoptimize_to_scale(sample_circuit, 1000.0, max_iterations=2, seed=4)
+    assert result.iterations == 2
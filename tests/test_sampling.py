@@ -0,0 +1,46 @@
+"""Tests for the seeded sampling of random gates."""
+
+import numpy as np
+import pytest
+
+from unopt.sampling import UnitaryPool, as_generator, haar_random_unitaries, spawn_generators
+
+
+@pytest.mark.parametrize("dim", [2, 4, 8])
+def test_haar_random_unitaries_are_unitary(dim: int) -> None:
+    """Test that every sampled matrix is unitary."""
+    unitaries = haar_random_unitaries(50, dim, seed=1)
+    assert unitaries.shape == (50, dim, dim)
+    products = unitaries @ unitaries.conj().transpose(0, 2, 1)
+    assert np.allclose(products, np.eye(dim))
+
+
+def test_haar_random_unitaries_are_seeded() -> None:
+    """Test that equal seeds give equal samples and different seeds do not."""
+    assert np.allclose(haar_random_unitaries(5, seed=7), haar_random_unitaries(5, seed=7))
+    assert not np.allclose(haar_random_unitaries(5, seed=7), haar_random_unitaries(5, seed=8))
+
+
+def test_haar_random_unitaries_are_uniform_in_phase() -> None:
+    """Test a moment of the Haar measure: E|Tr U|^2 = 1."""
+    unitaries = haar_random_unitaries(20_000, 4, seed=3)
+    traces = np.trace(unitaries, axis1=1, axis2=2)
+    assert np.isclose(np.mean(np.abs(traces) ** 2), 1.0, atol=0.05)
+
+
+def test_unitary_pool_refills_from_its_generator() -> None:
+    """Test that the pool hands out its batches in order and keeps drawing across refills."""
+    pool = UnitaryPool(seed=11, size=3)
+    drawn = np.stack([pool.draw() for _ in range(7)])
+
+    rng = as_generator(11)
+    expected = np.concatenate([haar_random_unitaries(3, 4, rng) for _ in range(3)])[:7]
+    assert np.allclose(drawn, expected)
+
+
+def test_spawn_generators_are_reproducible_and_independent() -> None:
+    """Test that spawned streams repeat for the same seed and differ from each other."""
+    first = [rng.integers(2**32) for rng in spawn_generators(5, 4)]
+    second = [rng.integers(2**32) for rng in spawn_generators(5, 4)]
+    assert first == second
+    assert len(set(first)) == 4
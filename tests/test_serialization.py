@@ -0,0 +1,15 @@
+"""Tests for circuit serialization."""
+
+from qiskit.quantum_info import Operator
+
+from unopt.circuit import generate_random_two_qubit_gate_circuit
+from unopt.recipe import insert
+from unopt.serialization import dump_circuit, load_circuit
+
+
+def test_qpy_round_trip_keeps_unitary_gates() -> None:
+    """Test that circuits holding the recipe's unitary gates survive a QPY round trip."""
+    qc, _ = insert(generate_random_two_qubit_gate_circuit(4, 3), strategy="concatenated", seed=1)
+    restored = load_circuit(dump_circuit(qc))
+    assert restored == qc
+    assert Operator(restored).equiv(Operator(qc))
@@ -0,0 +1,165 @@
+"""Tests for the pool of Aer simulators."""
+
+import threading
+
+import numpy as np
+import pytest
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit.library import quantum_volume
+from qiskit_aer.noise import NoiseModel
+
+from unopt import simulators
+from unopt.circuit import super_peaked_entangled_circuit
+from unopt.noise import amplitude_damping_noise_model, depolarizing_noise_model
+from unopt.qem import execute_no_shot_noise
+from unopt.simulators import (
+    MethodChoice,
+    SimulatorPool,
+    get_simulator,
+    max_log2_bond_dimension,
+    noise_model_fingerprint,
+    select_method,
+)
+
+
+def _rotated_chain(num_qubits: int) -> QuantumCircuit:
+    """A non-Clifford, weakly entangled chain of CNOTs between rotations, in the `u3`/`cx` basis."""
+    qc = QuantumCircuit(num_qubits)
+    for qubit in range(num_qubits):
+        qc.ry(0.1 * (qubit + 1), qubit)
+    for qubit in range(num_qubits - 1):
+        qc.cx(qubit, qubit + 1)
+        qc.rz(0.2, qubit + 1)
+    return transpile(qc, basis_gates=["u3", "cx"], optimization_level=0)
+
+
+def test_noise_model_fingerprint() -> None:
+    """Test that equal noise models share a fingerprint and different ones do not."""
+    assert noise_model_fingerprint(depolarizing_noise_model(0.01)) == noise_model_fingerprint(
+        depolarizing_noise_model(0.01)
+    )
+    assert noise_model_fingerprint(depolarizing_noise_model(0.01)) != noise_model_fingerprint(
+        depolarizing_noise_model(0.02)
+    )
+    assert noise_model_fingerprint(amplitude_damping_noise_model()) != noise_model_fingerprint(None)
+
+
+def test_pool_reuses_simulators() -> None:
+    """Test that the pool returns the same simulator for the same key."""
+    pool = SimulatorPool()
+    simulator = pool.get(noise_model=depolarizing_noise_model(0.01))
+    assert pool.get(noise_model=depolarizing_noise_model(0.01)) is simulator
+    assert pool.get(noise_model=depolarizing_noise_model(0.02)) is not simulator
+    assert pool.get(method="density_matrix", noise_model=depolarizing_noise_model(0.01)) is not simulator
+    assert pool.get(noise_model=depolarizing_noise_model(0.01), seed_simulator=1) is not simulator
+    assert pool.get(method="density_matrix").options.method == "density_matrix"
+    assert (pool.hits, pool.misses) == (1, 5)
+    assert get_simulator(method="statevector") is get_simulator(method="statevector")
+
+
+def test_pool_evicts_least_recently_used() -> None:
+    """Test that the pool stays within its size by dropping the least recently used simulator."""
+    pool = SimulatorPool(max_size=2)
+    first = pool.get(method="statevector")
+    pool.get(method="density_matrix")
+    assert pool.get(method="statevector") is first
+    pool.get(method="matrix_product_state")
+    assert len(pool) == 2
+    assert pool.get(method="statevector") is first
+    pool.get(method="density_matrix")
+    assert pool.misses == 4
+
+    with pytest.raises(ValueError, match="at least 1"):
+        SimulatorPool(max_size=0)
+
+
+def test_pool_is_thread_safe() -> None:
+    """Test that concurrent requests for one key create a single simulator."""
+    pool = SimulatorPool()
+    simulators = []
+
+    def request() -> None:
+        for _ in range(20):
+            simulators.append(pool.get(noise_model=depolarizing_noise_model(0.01)))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(simulator) for simulator in simulators}) == 1
+    assert pool.misses == 1
+
+
+def test_max_log2_bond_dimension() -> None:
+    """Test the bond dimension bound on a chain, a long-range gate and a generic gate."""
+    chain = super_peaked_entangled_circuit(6)
+    assert max_log2_bond_dimension(chain) == 1
+
+    qc = QuantumCircuit(6)
+    qc.cx(0, 5)
+    qc.cx(0, 5)
+    qc.unitary(np.eye(4), [2, 3])
+    assert max_log2_bond_dimension(qc) == 3
+    assert max_log2_bond_dimension(QuantumCircuit(1)) == 0
+
+
+@pytest.mark.parametrize(
+    ("qc", "noise_model", "shots", "method"),
+    [
+        (super_peaked_entangled_circuit(4), None, None, "stabilizer"),
+        (super_peaked_entangled_circuit(4), depolarizing_noise_model(0.01), 1000, "stabilizer"),
+        (super_peaked_entangled_circuit(4), depolarizing_noise_model(0.01), None, "density_matrix"),
+        (super_peaked_entangled_circuit(4), amplitude_damping_noise_model(), 1000, "density_matrix"),
+        (quantum_volume(4, seed=1), None, 1000, "statevector"),
+        (quantum_volume(4, seed=1), depolarizing_noise_model(0.01), 10, "statevector"),
+        (quantum_volume(20, depth=2, seed=1), None, None, "statevector"),
+        (_rotated_chain(20), None, None, "matrix_product_state"),
+        (_rotated_chain(20), depolarizing_noise_model(0.01), 1000, "statevector"),
+        (_rotated_chain(30), depolarizing_noise_model(0.01), 1000, "matrix_product_state"),
+    ],
+)
+def test_select_method(qc: QuantumCircuit, noise_model: NoiseModel | None, shots: int | None, method: str) -> None:
+    """Test the method chosen for Clifford, noisy, highly and weakly entangled circuits."""
+    assert select_method(qc, noise_model=noise_model, shots=shots).method == method
+
+
+def test_select_method_override() -> None:
+    """Test that an explicit method is used and reported as an override."""
+    choice = select_method(super_peaked_entangled_circuit(4), method="density_matrix")
+    assert choice == MethodChoice("density_matrix", "override")
+    with pytest.raises(ValueError, match="Unknown method"):
+        select_method(super_peaked_entangled_circuit(4), method="tensor_network_magic")
+
+
+@pytest.mark.parametrize("noisy", [False, True])
+def test_execute_no_shot_noise_agrees_across_methods(noisy: bool) -> None:
+    """Test that the automatically chosen method gives the same exact value as the density matrix method."""
+    noise_model = depolarizing_noise_model(0.02) if noisy else None
+    for qc in [super_peaked_entangled_circuit(5), _rotated_chain(5)]:
+        value, _ = execute_no_shot_noise(qc, noise_model=noise_model)
+        expected, _ = execute_no_shot_noise(qc, noise_model=noise_model, method="density_matrix")
+        assert value == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    ("qc", "noisy", "expected"),
+    [
+        (super_peaked_entangled_circuit(20), False, "stabilizer"),
+        (_rotated_chain(20), False, "matrix_product_state"),
+        (_rotated_chain(5), False, "statevector"),
+        (_rotated_chain(5), True, "density_matrix"),
+    ],
+)
+def test_execute_no_shot_noise_runs_selected_method(
+    qc: QuantumCircuit, noisy: bool, expected: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that `execute_no_shot_noise` runs on the simulator of the method `select_method` picks."""
+    noise_model = depolarizing_noise_model(0.02) if noisy else None
+    assert select_method(qc, noise_model=noise_model).method == expected
+
+    pool = SimulatorPool()
+    monkeypatch.setattr(simulators, "_default_pool", pool)
+    execute_no_shot_noise(qc, noise_model=noise_model)
+    assert [method for method, *_ in pool._simulators] == [expected]
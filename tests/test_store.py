@@ -0,0 +1,65 @@
+"""Tests for the on-disk store of benchmark trials."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from unopt.store import BenchStore
+
+
+def _row(trial_number: int) -> dict:
+    return {"trial_number": trial_number, "value": 0.5 * trial_number, "depths": [trial_number, 2 * trial_number]}
+
+
+def test_store_writes_chunks_and_reads_columns(tmp_path: Path) -> None:
+    """Test that trials are written in chunks and read back as sorted columns."""
+    store = BenchStore(tmp_path, chunk_size=2)
+    store.open({"shots": 100})
+    for trial_number in (3, 1, 2):
+        store.append(_row(trial_number))
+    assert len(list(tmp_path.glob("chunk-*.npz"))) == 1
+    assert store.completed_trials() == {1, 3}
+
+    store.flush()
+    columns = BenchStore(tmp_path).read_columns()
+    np.testing.assert_array_equal(columns["trial_number"], [1, 2, 3])
+    np.testing.assert_array_equal(columns["value"], [0.5, 1.0, 1.5])
+    np.testing.assert_array_equal(columns["depths"], [[1, 2], [2, 4], [3, 6]])
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_store_keeps_duplicate_trials_once(tmp_path: Path) -> None:
+    """Test that a trial written by two runs is read once."""
+    for _ in range(2):
+        store = BenchStore(tmp_path)
+        store.open({"shots": 100})
+        store.append(_row(1))
+    np.testing.assert_array_equal(BenchStore(tmp_path).read_columns()["trial_number"], [1])
+
+
+def test_store_checks_configuration(tmp_path: Path) -> None:
+    """Test that a run can only resume with the configuration it was started with."""
+    store = BenchStore(tmp_path)
+    store.open({"shots": 100, "iterations": [1, 2]}, metadata={"original_depth": 4})
+    BenchStore(tmp_path).open({"iterations": [1, 2], "shots": 100})
+    assert store.read_metadata()["metadata"] == {"original_depth": 4}
+    assert store.read_columns() == {} and store.completed_trials() == set()
+
+    with pytest.raises(ValueError, match="different configuration"):
+        BenchStore(tmp_path).open({"shots": 200, "iterations": [1, 2]})
+    with pytest.raises(ValueError, match="chunk size"):
+        BenchStore(tmp_path, chunk_size=0)
+
+
+def test_store_memory_maps_density_matrix(tmp_path: Path) -> None:
+    """Test that the density matrix is written once and read back memory-mapped."""
+    store = BenchStore(tmp_path)
+    assert store.read_density_matrix() is None
+
+    density_matrix = np.diag([0.25, 0.75]).astype(complex)
+    store.write_density_matrix(density_matrix)
+    store.write_density_matrix(np.zeros((2, 2), dtype=complex))
+    loaded = store.read_density_matrix()
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, density_matrix)
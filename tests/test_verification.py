@@ -0,0 +1,39 @@
+"""Tests for the randomized equivalence checks."""
+
+import pytest
+
+from unopt.circuit import generate_random_two_qubit_gate_circuit
+from unopt.recipe import unoptimize_circuit
+from unopt.verification import verify_equivalence
+
+
+@pytest.mark.parametrize(
+    "states,method",
+    [("product", "statevector"), ("stabilizer", "statevector"), ("product", "matrix_product_state")],
+)
+def test_verify_equivalence_accepts_unoptimized_circuits(states: str, method: str) -> None:
+    """Test that an unoptimized circuit passes, also with a different global phase."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(5, 4)
+    unoptimized_qc = unoptimize_circuit(sample_circuit, iterations=2, seed=1)
+    unoptimized_qc.global_phase += 0.7
+
+    result = verify_equivalence(sample_circuit, unoptimized_qc, samples=4, states=states, method=method, seed=2)
+    assert result
+    assert len(result.overlaps) == 4
+
+
+@pytest.mark.parametrize("states", ["product", "stabilizer"])
+def test_verify_equivalence_rejects_modified_circuits(states: str) -> None:
+    """Test that a circuit with an extra gate fails, whether the gate changes moduli or only relative phases."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 4)
+    for gate in ("x", "z"):
+        modified_qc = sample_circuit.copy()
+        getattr(modified_qc, gate)(1)
+        assert not verify_equivalence(sample_circuit, modified_qc, samples=8, states=states, seed=3)
+
+
+def test_unoptimize_circuit_verify_flag() -> None:
+    """Test that the debug flag lets correct results through."""
+    sample_circuit = generate_random_two_qubit_gate_circuit(4, 4)
+    verified = unoptimize_circuit(sample_circuit, iterations=2, seed=1, verify=True)
+    assert verified == unoptimize_circuit(sample_circuit, iterations=2, seed=1)
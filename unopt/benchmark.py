@@ -1,7 +1,13 @@
 """Benchmarking module for ZNE and unoptimized circuits."""
 
+import inspect
+import multiprocessing
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from typing import Any, Callable
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 import numpy as np
 
 from qiskit import QuantumCircuit
@@ -10,9 +16,17 @@ from qiskit_aer.noise import NoiseModel
 
 from mitiq import zne
 
+from unopt.cache import circuit_fingerprint
 from unopt.noise import depolarizing_noise_model
-from unopt.recipe import unoptimize_circuit
-from unopt.qem import execute_no_shot_noise, execute
+from unopt.recipe import unoptimize_ladder
+from unopt.qem import execute_batch, execute_no_shot_noise
+from unopt.sampling import spawn_generators
+from unopt.serialization import dump_circuit, load_circuit
+from unopt.simulators import noise_model_fingerprint
+from unopt.store import BenchStore
+
+# Folding methods that return the same circuit for the same input and scale factor.
+_DETERMINISTIC_FOLD_METHODS = (zne.scaling.fold_global, zne.scaling.fold_all)
 
 
 @dataclass
@@ -24,7 +38,7 @@ class BenchTrialResults:
     zne_fold_depths: list[int]
     zne_unopt_value: float
     zne_unopt_depths: list[int]
-    density_matrix: np.ndarray
+    density_matrix: np.ndarray | None = None
 
     def __str__(self) -> str:
         return (
@@ -89,76 +103,172 @@ def bench(
     extrapolation_method: Callable = zne.RichardsonFactory,
     trials: int = 1,
     verbose: bool = False,
+    seed: int | np.random.Generator | None = None,
+    store_density_matrices: bool = False,
+    method: str = "auto",
+    max_workers: int | None = 1,
+    store: str | os.PathLike[str] | None = None,
 ) -> BenchResults:
-    """Calculate ideal, unmitigated, ZNE-fold, and ZNE-unopt values/data."""
-    trial_results = []
-    ideal_values = []
-    unmit_values = []
-    zne_fold_values = []
-    zne_unopt_values = []
-    folded_depths_list = []
-    unopt_depths_list = []
+    """Calculate ideal, unmitigated, ZNE-fold, and ZNE-unopt values/data.
+
+    Every trial gets its own generator, spawned from `seed` (an integer or a NumPy generator) with
+    `spawn_generators`, which seeds the simulator of the trial, seeds `fold_method` if it takes a `seed` argument (as
+    `fold_gates_at_random` does), and then drives the random gates of its circuit unoptimization. Runs with the same
+    integer seed therefore give identical results, whether the trials run serially or, with `max_workers` other than
+    1, in parallel worker processes (None uses one per CPU), unless `fold_method` is random without taking a seed.
+    Parallel trials need `fold_method`, `extrapolation_method`, the backend and the noise model to be picklable.
+
+    The ideal value is computed without forming the density matrix of the circuit. Set `store_density_matrices` to
+    keep the noiseless density matrix in every `BenchTrialResults`, which takes 4^n memory per trial.
+
+    The simulation method is chosen by `unopt.simulators.select_method` unless `method` names one.
+
+    Work that is the same in every trial is done once: the ideal value, and the folded circuits and their depths when
+    `fold_method` is deterministic (`fold_global` or `fold_all`). Each trial then only samples the circuits and
+    unoptimizes the circuit afresh.
+
+    With a `store` directory, every finished trial is written to a `BenchStore`, and the noiseless density matrix, if
+    kept, once to a file that is read back memory-mapped. Running again with the same store and parameters skips the trials
+    already stored, so an interrupted run resumes where it stopped; with an integer seed the resumed trials equal
+    those of an uninterrupted run. The results are then loaded from the store, see `load_bench_results`.
+    """
+    if trials < 1:
+        raise ValueError(f"The number of trials must be at least 1, got {trials}.")
 
     original_depth = qc.depth()
 
-    for trial in range(trials):
-        if verbose:
-            print(f"Running Trial {trial + 1}/{trials}...")
+    # Ideal (noiseless) expectation value, which is exact and so the same in every trial:
+    ideal_value, density_matrix = execute_no_shot_noise(qc, return_density_matrix=store_density_matrices, method=method)
 
-        # Ideal (noiseless) expectation value:
-        ideal_value, density_matrix = execute_no_shot_noise(qc, return_density_matrix=True)
-        ideal_values.append(ideal_value)
+    folded_payloads = None
+    if fold_method in _DETERMINISTIC_FOLD_METHODS:
+        folded_payloads = [dump_circuit(fold_method(qc, s)) for s in scale_factors_zne]
 
-        # Unmitigated expectation value:
-        unmit_value = execute(circuit=qc, backend=backend, shots=shots, noise_model=noise_model)
-        unmit_values.append(unmit_value)
+    options = {
+        "backend": backend,
+        "noise_model": noise_model,
+        "shots": shots,
+        "scale_factors_zne": scale_factors_zne,
+        "iterations_unopt": iterations_unopt,
+        "fold_method": fold_method,
+        "extrapolation_method": extrapolation_method,
+        "method": method,
+        "trials": trials,
+        "verbose": verbose,
+    }
+    bench_store = None
+    completed: set[int] = set()
+    if store is not None:
+        bench_store = BenchStore(store)
+        bench_store.open(
+            config=_store_config(
+                qc,
+                backend,
+                noise_model,
+                shots,
+                scale_factors_zne,
+                iterations_unopt,
+                fold_method,
+                extrapolation_method,
+                method,
+                seed,
+            ),
+            metadata={"original_depth": original_depth},
+        )
+        if density_matrix is not None:
+            bench_store.write_density_matrix(density_matrix)
+        completed = bench_store.completed_trials()
+        if verbose and completed:
+            print(f"Resuming with {len(completed)} trials already stored.")
 
-        # ZNE + Fold:
-        folded_circuits = [fold_method(qc, s) for s in scale_factors_zne]
-        folded_values = [
-            execute(circuit=circ, backend=backend, shots=shots, noise_model=noise_model) for circ in folded_circuits
-        ]
-        folded_depths = [circ.depth() for circ in folded_circuits]
-        folded_depths_list.append(folded_depths)
-
-        factory = extrapolation_method(scale_factors_zne)
-        [factory.push({"scale_factor": s}, val) for s, val in zip(scale_factors_zne, folded_values)]
-        zne_fold_value = factory.reduce()
-        zne_fold_values.append(zne_fold_value)
-
-        # ZNE + Unopt:
-        unoptimized_circuits = [unoptimize_circuit(qc, iterations=i) for i in iterations_unopt]
-        unoptimized_values = [
-            execute(circuit=c, backend=backend, shots=shots, noise_model=noise_model) for c in unoptimized_circuits
-        ]
-        unoptimized_depths = [circ.depth() for circ in unoptimized_circuits]
-        unopt_depths_list.append(unoptimized_depths)
+    payload = dump_circuit(qc)
+    jobs = [
+        (trial, payload, folded_payloads, trial_rng, options)
+        for trial, trial_rng in enumerate(spawn_generators(seed, trials))
+        if trial + 1 not in completed
+    ]
+
+    trial_results = []
+    with ExitStack() as stack:
+        if max_workers == 1 or len(jobs) < 2:
+            outcomes: Iterator[dict[str, Any]] = map(_bench_trial, jobs)
+        else:
+            # Spawned rather than forked workers, as forking after the transpiler has run can deadlock.
+            executor = stack.enter_context(
+                ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            )
+            outcomes = executor.map(_bench_trial, jobs)
+
+        # Trials are stored as they complete, so an interrupted run keeps every finished trial.
+        if bench_store is not None:
+            stack.callback(bench_store.flush)
+        for (trial, *_), outcome in zip(jobs, outcomes):
+            trial_result = BenchTrialResults(
+                trial_number=trial + 1, ideal_value=ideal_value, density_matrix=density_matrix, **outcome
+            )
+            trial_results.append(trial_result)
+            if bench_store is not None:
+                bench_store.append(
+                    {name: value for name, value in asdict(trial_result).items() if name != "density_matrix"}
+                )
+
+    if store is not None:
+        return load_bench_results(store, trials=trials)
+    average_results = average_trials(trial_results, original_depth)
+    return BenchResults(average_results=average_results, trial_results=trial_results)
+
+
+def load_bench_results(store: str | os.PathLike[str], trials: int | None = None) -> BenchResults:
+    """Load the results of a `bench` run from its store, without recomputing any trial.
+
+    Args:
+        store: The store directory passed to `bench`.
+        trials: If given, only load trials 1 to `trials`.
 
-        scale_factors_unopt = [depth / original_depth for depth in unoptimized_depths]
-        factory = extrapolation_method(scale_factors_unopt)
-        [factory.push({"scale_factor": s}, val) for s, val in zip(scale_factors_unopt, unoptimized_values)]
-        zne_unopt_value = factory.reduce()
-        zne_unopt_values.append(zne_unopt_value)
+    Returns:
+        The results of the stored trials, in trial order, and their averages. Every trial references the same
+        memory-mapped density matrix, if one was stored.
+    """
+    bench_store = BenchStore(store)
+    original_depth = bench_store.read_metadata()["metadata"]["original_depth"]
+    columns = bench_store.read_columns()
+    if not columns:
+        raise ValueError(f"The store at {store} holds no trials.")
+    density_matrix = bench_store.read_density_matrix()
 
-        # Store trial-specific results
+    trial_results = []
+    for idx, trial_number in enumerate(columns["trial_number"].tolist()):
+        if trials is not None and trial_number > trials:
+            continue
         trial_results.append(
             BenchTrialResults(
-                trial_number=trial + 1,
-                ideal_value=ideal_value,
-                unmit_value=unmit_value,
-                zne_fold_value=zne_fold_value,
-                zne_fold_depths=folded_depths,
-                zne_unopt_value=zne_unopt_value,
-                zne_unopt_depths=unoptimized_depths,
+                trial_number=trial_number,
+                ideal_value=float(columns["ideal_value"][idx]),
+                unmit_value=float(columns["unmit_value"][idx]),
+                zne_fold_value=float(columns["zne_fold_value"][idx]),
+                zne_fold_depths=columns["zne_fold_depths"][idx].tolist(),
+                zne_unopt_value=float(columns["zne_unopt_value"][idx]),
+                zne_unopt_depths=columns["zne_unopt_depths"][idx].tolist(),
                 density_matrix=density_matrix,
             )
         )
+    return BenchResults(average_results=average_trials(trial_results, original_depth), trial_results=trial_results)
+
+
+def average_trials(trial_results: list[BenchTrialResults], original_depth: int) -> BenchAverageResults:
+    """Average the results of benchmark trials.
 
-    # Compute averages
-    avg_ideal_value = np.mean(ideal_values)
-    avg_unmit_value = np.mean(unmit_values)
-    avg_zne_fold_value = np.mean(zne_fold_values)
-    avg_zne_unopt_value = np.mean(zne_unopt_values)
+    Args:
+        trial_results: The results of every trial.
+        original_depth: The depth of the benchmarked circuit.
+
+    Returns:
+        The averaged results.
+    """
+    avg_ideal_value = float(np.mean([trial.ideal_value for trial in trial_results]))
+    avg_unmit_value = float(np.mean([trial.unmit_value for trial in trial_results]))
+    avg_zne_fold_value = float(np.mean([trial.zne_fold_value for trial in trial_results]))
+    avg_zne_unopt_value = float(np.mean([trial.zne_unopt_value for trial in trial_results]))
 
     avg_unmit_error = abs(avg_ideal_value - avg_unmit_value)
     avg_zne_fold_error = abs(avg_ideal_value - avg_zne_fold_value)
@@ -167,7 +277,7 @@ def bench(
     percent_improvement_unmit = ((avg_unmit_error - avg_zne_unopt_error) / avg_zne_unopt_error) * 100
     percent_improvement_zne_fold = ((avg_zne_fold_error - avg_zne_unopt_error) / avg_zne_unopt_error) * 100
 
-    average_results = BenchAverageResults(
+    return BenchAverageResults(
         avg_ideal_value=avg_ideal_value,
         avg_unmit_value=avg_unmit_value,
         avg_unmit_error=avg_unmit_error,
@@ -178,8 +288,100 @@ def bench(
         percent_improvement_unmit=percent_improvement_unmit,
         percent_improvement_zne_fold=percent_improvement_zne_fold,
         original_circuit_depth=original_depth,
-        avg_zne_fold_circuit_depths=np.mean(folded_depths_list, axis=0).tolist(),
-        avg_zne_unopt_circuit_depths=np.mean(unopt_depths_list, axis=0).tolist(),
+        avg_zne_fold_circuit_depths=np.mean([trial.zne_fold_depths for trial in trial_results], axis=0).tolist(),
+        avg_zne_unopt_circuit_depths=np.mean([trial.zne_unopt_depths for trial in trial_results], axis=0).tolist(),
     )
 
-    return BenchResults(average_results=average_results, trial_results=trial_results)
+
+def _store_config(
+    qc: QuantumCircuit,
+    backend: Any,
+    noise_model: NoiseModel,
+    shots: int,
+    scale_factors_zne: list[float],
+    iterations_unopt: list[int],
+    fold_method: Callable,
+    extrapolation_method: Callable,
+    method: str,
+    seed: int | np.random.Generator | None,
+) -> dict[str, Any]:
+    """Return the parameters that a resumed `bench` run must share with the stored run."""
+    return {
+        "circuit": circuit_fingerprint(qc),
+        "backend": getattr(backend, "name", type(backend).__name__),
+        "noise_model": noise_model_fingerprint(noise_model),
+        "shots": shots,
+        "scale_factors_zne": [float(s) for s in scale_factors_zne],
+        "iterations_unopt": [int(i) for i in iterations_unopt],
+        "fold_method": f"{fold_method.__module__}.{fold_method.__qualname__}",
+        "extrapolation_method": f"{extrapolation_method.__module__}.{extrapolation_method.__qualname__}",
+        "method": method,
+        # Only an integer seed determines the trials; other seeds cannot be checked.
+        "seed": int(seed) if isinstance(seed, int | np.integer) else None,
+    }
+
+
+def _bench_trial(job: tuple[int, bytes, list[bytes] | None, np.random.Generator, dict[str, Any]]) -> dict[str, Any]:
+    """Run one trial of `bench` and return the fields of its `BenchTrialResults` that vary between trials.
+
+    This is the worker entry point of `bench`. The trial's generator seeds the simulator first, then a random folding
+    method that takes a `seed`, and then drives the unoptimization, so a trial gives the same results in any process.
+    """
+    trial, payload, folded_payloads, rng, options = job
+    if options["verbose"]:
+        print(f"Running Trial {trial + 1}/{options['trials']}...")
+
+    qc = load_circuit(payload)
+    scale_factors_zne = options["scale_factors_zne"]
+    iterations_unopt = options["iterations_unopt"]
+    seed_simulator = int(rng.integers(2**31))
+
+    # The folded circuits are shared by all trials unless the folding method is random.
+    fold_method = options["fold_method"]
+    if folded_payloads is not None:
+        folded_circuits = [load_circuit(folded) for folded in folded_payloads]
+    elif "seed" in inspect.signature(fold_method).parameters:
+        fold_seeds = rng.integers(2**31, size=len(scale_factors_zne))
+        folded_circuits = [
+            fold_method(qc, s, seed=int(fold_seed)) for s, fold_seed in zip(scale_factors_zne, fold_seeds)
+        ]
+    else:
+        folded_circuits = [fold_method(qc, s) for s in scale_factors_zne]
+    folded_depths = [circ.depth() for circ in folded_circuits]
+
+    # One pass of the recipe yields the circuits for every requested iteration count.
+    rungs = {rung.iterations: rung.circuit for rung in unoptimize_ladder(qc, iterations_unopt, seed=rng)}
+    unoptimized_circuits = [rungs[i] for i in iterations_unopt]
+    unoptimized_depths = [circ.depth() for circ in unoptimized_circuits]
+
+    # The unmitigated, folded and unoptimized circuits all run in a single job.
+    values = execute_batch(
+        [qc, *folded_circuits, *unoptimized_circuits],
+        backend=options["backend"],
+        shots=options["shots"],
+        noise_model=options["noise_model"],
+        method=options["method"],
+        seed_simulator=seed_simulator,
+    )
+    unmit_value = float(values[0])
+    folded_values = values[1 : 1 + len(folded_circuits)]
+    unoptimized_values = values[1 + len(folded_circuits) :]
+
+    # ZNE + Fold:
+    factory = options["extrapolation_method"](scale_factors_zne)
+    [factory.push({"scale_factor": s}, val) for s, val in zip(scale_factors_zne, folded_values)]
+    zne_fold_value = factory.reduce()
+
+    # ZNE + Unopt:
+    scale_factors_unopt = [depth / qc.depth() for depth in unoptimized_depths]
+    factory = options["extrapolation_method"](scale_factors_unopt)
+    [factory.push({"scale_factor": s}, val) for s, val in zip(scale_factors_unopt, unoptimized_values)]
+    zne_unopt_value = factory.reduce()
+
+    return {
+        "unmit_value": unmit_value,
+        "zne_fold_value": zne_fold_value,
+        "zne_fold_depths": folded_depths,
+        "zne_unopt_value": zne_unopt_value,
+        "zne_unopt_depths": unoptimized_depths,
+    }
@@ -0,0 +1,184 @@
+"""Content-addressed on-disk cache of unoptimized circuits."""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import qiskit
+from qiskit import QuantumCircuit
+
+from unopt.recipe import unoptimize_circuit
+from unopt.serialization import dump_circuit, load_circuit
+from unopt.verification import verify_equivalence
+
+# Bump when the recipe changes in a way that invalidates previously cached circuits.
+CACHE_FORMAT_VERSION = 1
+# Arguments of `unoptimize_circuit` that do not change its result, and so are not part of the cache key.
+_UNKEYED_PARAMS = ("verify", "profiler")
+
+
+def circuit_fingerprint(qc: QuantumCircuit) -> str:
+    """Return a hash of the structure of a quantum circuit.
+
+    Two circuits get the same fingerprint when they have the same register sizes, global phase and sequence of
+    operations, parameters and qubit/clbit indices. Names and metadata are ignored.
+
+    Args:
+        qc: The quantum circuit to hash.
+
+    Returns:
+        The hex digest of the structural hash.
+    """
+    digest = hashlib.sha256()
+    _update_fingerprint(digest, qc)
+    return digest.hexdigest()
+
+
+def _update_fingerprint(digest: Any, qc: QuantumCircuit) -> None:
+    """Feed the structure of `qc` into a hash object."""
+    digest.update(f"{qc.num_qubits},{qc.num_clbits},{float(qc.global_phase)!r};".encode())
+    for instruction in qc.data:
+        operation = instruction.operation
+        qubits = [qc.find_bit(q).index for q in instruction.qubits]
+        clbits = [qc.find_bit(c).index for c in instruction.clbits]
+        digest.update(f"{operation.name},{operation.num_qubits},{qubits},{clbits}(".encode())
+        for param in operation.params:
+            if isinstance(param, QuantumCircuit):
+                _update_fingerprint(digest, param)
+            elif isinstance(param, np.ndarray):
+                digest.update(np.ascontiguousarray(param, dtype=complex).tobytes())
+            else:
+                digest.update(repr(param).encode())
+            digest.update(b",")
+        digest.update(b");")
+
+
+class CircuitCache:
+    """Size-bounded on-disk cache of `unoptimize_circuit` results.
+
+    Results are stored as QPY files named by a hash of the input circuit's structure (see `circuit_fingerprint`), the
+    recipe parameters and the Qiskit version. The modification time of a file records its last use, and the least
+    recently used files are deleted once the cache grows beyond `max_bytes`.
+
+    Only calls with an integer seed are cached: without a seed (or with a generator) the result is not a function of
+    the parameters, so such calls are passed through to `unoptimize_circuit` and not counted. `verify` and `profiler`
+    do not change the result and are not part of the key: a cached result is checked again if `verify` is set, and a
+    profiler only records stages when the result is computed.
+
+    Args:
+        directory: The cache directory, created if needed.
+        max_bytes: The maximum total size of the cached files.
+
+    Attributes:
+        hits: The number of results loaded from the cache.
+        misses: The number of results computed and stored.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], max_bytes: int = 512 * 1024**2) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def unoptimize_circuit(
+        self, qc: QuantumCircuit, iterations: int = 1, seed: int | np.random.Generator | None = None, **kwargs: Any
+    ) -> QuantumCircuit:
+        """Return `unoptimize_circuit(qc, iterations, seed=seed, **kwargs)`, from the cache when possible.
+
+        Args:
+            qc: The input quantum circuit.
+            iterations: The number of times to apply the recipe.
+            seed: The seed of the recipe. Only integer seeds are cached.
+            **kwargs: The other keyword arguments of `unoptimize_circuit`.
+
+        Returns:
+            The unoptimized quantum circuit.
+        """
+        if isinstance(seed, np.random.Generator) or seed is None:
+            return unoptimize_circuit(qc, iterations=iterations, seed=seed, **kwargs)
+
+        path = self.directory / f"{self.key(qc, iterations=iterations, seed=seed, **kwargs)}.qpy"
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            pass
+        else:
+            self.hits += 1
+            os.utime(path)
+            result = load_circuit(payload)
+            if kwargs.get("verify", False):
+                equivalence = verify_equivalence(qc, result)
+                if not equivalence:
+                    raise RuntimeError(
+                        "The unoptimized circuit is not equivalent to the input circuit "
+                        f"(overlaps {equivalence.overlaps})."
+                    )
+            return result
+
+        self.misses += 1
+        result = unoptimize_circuit(qc, iterations=iterations, seed=seed, **kwargs)
+        self._store(path, dump_circuit(result))
+        return result
+
+    def key(self, qc: QuantumCircuit, **params: Any) -> str:
+        """Return the cache key of a circuit and a set of recipe parameters.
+
+        Args:
+            qc: The input quantum circuit.
+            **params: The keyword arguments of `unoptimize_circuit`, other than `qc`. Omitted arguments take their
+                default values, and `verify` and `profiler` are ignored.
+
+        Returns:
+            The hex digest identifying the cached result.
+        """
+        # Fill in defaults so that spelling out a default value gives the same key as omitting it.
+        bound = inspect.signature(unoptimize_circuit).bind(qc, **params)
+        bound.apply_defaults()
+        for name in ("qc", *_UNKEYED_PARAMS):
+            del bound.arguments[name]
+        description = {
+            "format": CACHE_FORMAT_VERSION,
+            "qiskit": qiskit.__version__,
+            "circuit": circuit_fingerprint(qc),
+            "params": {
+                name: int(value) if isinstance(value, np.integer) else value for name, value in bound.arguments.items()
+            },
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def size(self) -> int:
+        """Return the total size in bytes of the cached files."""
+        return sum(path.stat().st_size for path in self.directory.glob("*.qpy"))
+
+    def clear(self) -> None:
+        """Delete every cached file and reset the counters."""
+        for path in self.directory.glob("*.qpy"):
+            path.unlink(missing_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, path: Path, payload: bytes) -> None:
+        """Write a payload atomically, then evict the least recently used files beyond `max_bytes`."""
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as handle:
+            handle.write(payload)
+        os.replace(handle.name, path)
+
+        entries = []
+        for entry in self.directory.glob("*.qpy"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
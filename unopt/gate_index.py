@@ -0,0 +1,135 @@
+"""Qubit-indexed lookup of the two-qubit gates in a circuit."""
+
+from collections.abc import Sequence
+
+import numpy as np
+from qiskit import QuantumCircuit
+
+
+class TwoQubitGateIndex:
+    """Array-backed index of the two-qubit gates of a quantum circuit.
+
+    Gates are stored in instruction order as two parallel arrays: `positions` holds the index of each gate in
+    `qc.data` and `qubits` holds its pair of qubit indices. The per-qubit view (which gates act on a given qubit) is
+    derived lazily from these arrays and cached until the index is modified with `splice`.
+
+    Args:
+        positions: Instruction indices of the two-qubit gates, in increasing order.
+        qubits: Array of shape (G, 2) with the qubit indices of each gate.
+        num_qubits: The number of qubits of the indexed circuit.
+    """
+
+    def __init__(self, positions: np.ndarray, qubits: np.ndarray, num_qubits: int) -> None:
+        self.positions: np.ndarray = np.asarray(positions, dtype=np.int64)
+        self.qubits: np.ndarray = np.asarray(qubits, dtype=np.int64).reshape(-1, 2)
+        self.num_qubits = num_qubits
+        self._by_qubit: tuple[np.ndarray, np.ndarray] | None = None
+
+    @classmethod
+    def from_circuit(cls, qc: QuantumCircuit) -> "TwoQubitGateIndex":
+        """Build the index by scanning the instructions of a circuit once.
+
+        Args:
+            qc: The quantum circuit to index.
+
+        Returns:
+            The index of the two-qubit gates of `qc`.
+        """
+        positions = []
+        qubits = []
+        for idx, instruction in enumerate(qc.data):
+            if len(instruction.qubits) == 2:
+                positions.append(idx)
+                qubits.append([qc.find_bit(qarg).index for qarg in instruction.qubits])
+        return cls(np.array(positions, dtype=np.int64), np.array(qubits, dtype=np.int64), qc.num_qubits)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def gates_on(self, qubit: int) -> np.ndarray:
+        """Return the ids of the gates acting on `qubit`, in instruction order.
+
+        Args:
+            qubit: The qubit index.
+
+        Returns:
+            Gate ids, i.e. row indices into `positions` and `qubits`.
+        """
+        offsets, gate_ids = self._qubit_view()
+        return gate_ids[offsets[qubit] : offsets[qubit + 1]]
+
+    def concatenated_candidates(self) -> tuple[np.ndarray, np.ndarray]:
+        """Find every gate B1 that is followed by a later gate sharing exactly one qubit with it.
+
+        For each gate acting on (a, b), the later gates on qubit `a` are scanned in runs of equal partner qubit: the
+        first gate of the next run is the earliest later gate that touches `a` but not `b`. The shared qubit is the one
+        whose partner gate comes first, which matches a pairwise search over all (i, j) with i < j.
+
+        Returns:
+            A tuple containing:
+                - The ids of the candidate gates, in instruction order.
+                - The qubit each candidate shares with its partner gate.
+        """
+        num_gates = len(self)
+        if num_gates < 2:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        offsets, gate_ids = self._qubit_view()
+        entry_qubit = np.repeat(np.arange(self.num_qubits), np.diff(offsets))
+        slot = (self.qubits[gate_ids] == entry_qubit[:, None]).argmax(axis=1)
+        partner = self.qubits[gate_ids, 1 - slot]
+
+        # A run is a maximal stretch of consecutive entries on the same qubit with the same partner.
+        run_start = np.ones(len(gate_ids), dtype=bool)
+        run_start[1:] = (entry_qubit[1:] != entry_qubit[:-1]) | (partner[1:] != partner[:-1])
+        run_id = np.cumsum(run_start) - 1
+        run_first = np.flatnonzero(run_start)
+        next_first = np.append(run_first[1:], len(gate_ids))
+
+        following = next_first[run_id]
+        valid = following < len(gate_ids)
+        valid[valid] = entry_qubit[following[valid]] == entry_qubit[valid]
+
+        # Earliest position of a partner gate for each (gate, qubit slot); gates without one stay at the sentinel.
+        sentinel = np.iinfo(np.int64).max
+        partner_pos = np.full((num_gates, 2), sentinel, dtype=np.int64)
+        partner_pos[gate_ids[valid], slot[valid]] = self.positions[gate_ids[following[valid]]]
+
+        candidates = np.flatnonzero(partner_pos.min(axis=1) != sentinel)
+        shared = self.qubits[candidates, partner_pos[candidates].argmin(axis=1)]
+        return candidates, shared
+
+    def splice(self, start: int, stop: int, new_qubits: Sequence[Sequence[int]]) -> None:
+        """Update the index after replacing the instructions `qc.data[start:stop]` with new ones.
+
+        Args:
+            start: Index of the first replaced instruction.
+            stop: Index one past the last replaced instruction. Equal to `start` for a pure insertion.
+            new_qubits: Qubit indices of each new instruction, in order.
+        """
+        keep = (self.positions < start) | (self.positions >= stop)
+        positions = self.positions[keep]
+        qubits = self.qubits[keep]
+        positions[positions >= stop] += len(new_qubits) - (stop - start)
+
+        new_positions = [start + offset for offset, qargs in enumerate(new_qubits) if len(qargs) == 2]
+        if new_positions:
+            new_pairs = np.array([qargs for qargs in new_qubits if len(qargs) == 2], dtype=np.int64)
+            at = np.searchsorted(positions, start)
+            positions = np.insert(positions, at, new_positions)
+            qubits = np.insert(qubits, at, new_pairs, axis=0)
+
+        self.positions = positions
+        self.qubits = qubits
+        self._by_qubit = None
+
+    def _qubit_view(self) -> tuple[np.ndarray, np.ndarray]:
+        """Return the CSR-style (offsets, gate ids) grouping of gates by qubit, computing it if needed."""
+        if self._by_qubit is None:
+            entry_qubit = self.qubits.ravel()
+            order = np.argsort(entry_qubit, kind="stable")
+            gate_ids = order // 2
+            counts = np.bincount(entry_qubit, minlength=self.num_qubits)
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            self._by_qubit = (offsets, gate_ids)
+        return self._by_qubit
@@ -20,7 +20,8 @@ from unopt.benchmark import bench
 from unopt.noise import depolarizing_noise_model
 from unopt.qaoa import create_qaoa_circuit, measure_sample_cuts, calculate_max_cut_cost
 from unopt.qv import get_exact_hop, hop
-from unopt.recipe import unoptimize_circuit
+from unopt.recipe import unoptimize_ladder
+from unopt.simulators import get_simulator
 from unopt.utils import quadratic
 
 
@@ -172,20 +173,20 @@ def plot_quantum_volume(
 
     init = dict(qc.count_ops())["u3"] + dict(qc.count_ops())["cx"]
 
+    noise_model = depolarizing_noise_model(error=0.001)
+    # noise_model = amplitude_damping_noise_model()
+    noisy_backend = get_simulator(noise_model=noise_model)
+
     x, y = [], []
-    for idx in range(unoptimization_rounds):
+    ladder = unoptimize_ladder(qc, range(unoptimization_rounds), strategy=unoptimization_strategy, seed=seed)
+    for idx, rung in enumerate(ladder):
         print(f"Running iteration {idx} out of {unoptimization_rounds}")
 
-        scaled = unoptimize_circuit(copy.deepcopy(qc), iterations=idx, strategy=unoptimization_strategy)
-        scaled = transpile(scaled, basis_gates=["u3", "cx"], optimization_level=3)
+        scaled = transpile(rung.circuit, basis_gates=["u3", "cx"], optimization_level=3)
         scaled_count = dict(scaled.count_ops())["u3"] + dict(scaled.count_ops())["cx"]
         scale_factor = scaled_count / float(init)
 
-        backend = AerSimulator()
-        noise_model = depolarizing_noise_model(error=0.001)
-        # noise_model = amplitude_damping_noise_model()
-
-        result = backend.run(scaled, noise_model=noise_model, shots=shots).result()
+        result = noisy_backend.run(scaled, shots=shots).result()
         counts = result.get_counts()
 
         experimental_prob = hop(counts, ideal_probs)
@@ -282,28 +283,26 @@ def plot_qaoa(
     init = dict(qc.count_ops())["u3"] + dict(qc.count_ops())["cx"]
 
     shots = 10_000_000
-    backend = AerSimulator()
-    result = backend.run(qc, shots=shots).result()
+    result = get_simulator().run(qc, shots=shots).result()
     counts = result.get_counts()
 
     cuts = measure_sample_cuts(counts, G)
     no_noise_cut_value = np.mean(cuts)
     print(f"No noise: {no_noise_cut_value}")
 
+    shots = 1_000_000
+    noisy_backend = get_simulator(noise_model=depolarizing_noise_model(error=0.001))
+
     x, y = [], []
-    for idx in range(1, unoptimization_rounds):
+    ladder = unoptimize_ladder(qc, range(1, unoptimization_rounds), strategy=unoptimization_strategy, seed=seed)
+    for idx, rung in enumerate(ladder, start=1):
         print(f"Running iteration {idx} out of {unoptimization_rounds}")
 
-        scaled = unoptimize_circuit(copy.deepcopy(qc), iterations=idx, strategy=unoptimization_strategy)
-        scaled = transpile(scaled, basis_gates=["u3", "cx"], optimization_level=3)
+        scaled = transpile(rung.circuit, basis_gates=["u3", "cx"], optimization_level=3)
         scaled_count = dict(scaled.count_ops())["u3"] + dict(scaled.count_ops())["cx"]
         scale_factor = scaled_count / float(init)
 
-        backend = AerSimulator()
-        noise_model = depolarizing_noise_model(error=0.001)
-        shots = 1_000_000
-
-        result = backend.run(scaled, noise_model=noise_model, shots=shots).result()
+        result = noisy_backend.run(scaled, shots=shots).result()
         counts = result.get_counts()
 
         cuts = measure_sample_cuts(counts, G)
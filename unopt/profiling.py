@@ -0,0 +1,110 @@
+"""Per-stage profiling of the elementary recipe."""
+
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+
+from qiskit import QuantumCircuit
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one stage of one recipe iteration.
+
+    `gate_count` and `depth` describe the working circuit after the stage. `peak_memory` is the peak of Python-level
+    allocations during the stage, as seen by `tracemalloc` (which includes NumPy arrays but not memory allocated
+    inside Qiskit's Rust code), or None when memory tracing is off.
+    """
+
+    iteration: int
+    stage: str
+    wall_time: float
+    gate_count: int
+    depth: int
+    peak_memory: int | None
+
+
+class StageHandle:
+    """Handle of a running stage; set `circuit` to the working circuit before the stage ends."""
+
+    def __init__(self) -> None:
+        self.circuit: QuantumCircuit | None = None
+
+
+class RecipeProfiler:
+    """Collects a `StageRecord` for every stage of every iteration of `unoptimize_circuit`.
+
+    Pass an instance as `unoptimize_circuit(..., profiler=profiler)` and read `records`, or `as_dict()` for a
+    column-oriented view that can be passed to `pandas.DataFrame`. The stages are "insert", "swap", "decompose",
+    "synthesize" and "index" (rebuilding the two-qubit gate index) with full synthesis, and "insert", "swap" and
+    "synthesize_window" with window synthesis. Deferred synthesis at the end of a run is recorded under the last
+    iteration.
+
+    Args:
+        trace_memory: Whether to measure peak allocations with `tracemalloc`. Tracing slows down allocation-heavy
+            code, so wall times are lower with it turned off.
+        enabled: Whether to record anything. A disabled profiler only runs the stages.
+    """
+
+    def __init__(self, trace_memory: bool = True, enabled: bool = True) -> None:
+        self.trace_memory = trace_memory
+        self.enabled = enabled
+        self.records: list[StageRecord] = []
+
+    @contextmanager
+    def stage(self, iteration: int, name: str) -> Iterator[StageHandle]:
+        """Time a stage and record it with the circuit stored in the yielded handle.
+
+        Args:
+            iteration: The recipe iteration, starting at 1.
+            name: The name of the stage.
+
+        Yields:
+            The handle whose `circuit` the stage sets.
+        """
+        handle = StageHandle()
+        if not self.enabled:
+            yield handle
+            return
+
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            wall_time = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            if started_tracing:
+                tracemalloc.stop()
+
+        circuit = handle.circuit
+        self.records.append(
+            StageRecord(
+                iteration=iteration,
+                stage=name,
+                wall_time=wall_time,
+                gate_count=len(circuit) if circuit is not None else 0,
+                depth=circuit.depth() if circuit is not None else 0,
+                peak_memory=peak_memory,
+            )
+        )
+
+    def as_dict(self) -> dict[str, list]:
+        """Return the records as a dict of columns, one list per `StageRecord` field."""
+        return {field.name: [getattr(record, field.name) for record in self.records] for field in fields(StageRecord)}
+
+    def total_times(self) -> dict[str, float]:
+        """Return the total wall time spent in each stage, over all iterations."""
+        totals: dict[str, float] = {}
+        for record in self.records:
+            totals[record.stage] = totals.get(record.stage, 0.0) + record.wall_time
+        return totals
+
+    def __repr__(self) -> str:
+        return f"RecipeProfiler({[asdict(record) for record in self.records]})"
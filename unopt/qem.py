@@ -1,19 +1,31 @@
 """Quantum error mitigation with unoptimized circuits."""
 
+import asyncio
+from collections.abc import Sequence
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
 import numpy as np
 
 from qiskit import QuantumCircuit, transpile
-from qiskit_aer import AerSimulator
+from qiskit.primitives import BitArray, PrimitiveResult
 from qiskit.providers import Backend
 from qiskit_aer.noise import NoiseModel
 from qiskit_ibm_runtime import SamplerV2
 
+from unopt.sampling import as_generator
+from unopt.simulators import get_simulator, select_method
+
+# Parity of the number of set bits of every byte value.
+_BYTE_PARITY = np.array([value.bit_count() % 2 for value in range(256)], dtype=np.uint8)
+
 
 def execute(
     circuit: QuantumCircuit,
     backend: Backend,
     shots: int,
     noise_model: NoiseModel | None = None,
+    method: str = "auto",
 ) -> float:
     """
     Execute a Qiskit quantum circuit and calculate the expectation value of the Z operator
@@ -29,79 +41,390 @@ def execute(
         shots (int): The number of measurement shots to use.
         noise_model (NoiseModel | None, optional): An optional noise model to simulate.
             If provided, the circuit will be simulated with the specified noise model.
+        method (str, optional): The simulation method used with a noise model, as in `execute_batch`.
 
     Returns:
         float: The expectation value of the Z operator on the 0th qubit.
 
     Notes:
-        - Qiskit follows little-endian ordering for qubits. The outcome bitstrings
-          are reversed during processing to ensure correct calculations.
+        - The value is computed from the packed measurement bits by `z_expectation_values`,
+          where bit i of an outcome is the measurement of qubit i.
         - The function assumes that the input circuit does not already contain measurement
           operations, as it adds measurement gates to all qubits in the circuit.
     """
-    circuit_with_measurement = circuit.copy()
-    circuit_with_measurement.measure_all()
+    return float(execute_batch([circuit], backend, shots, noise_model=noise_model, method=method)[0])
+
+
+def execute_batch(
+    circuits: Sequence[QuantumCircuit],
+    backend: Backend,
+    shots: int,
+    noise_model: NoiseModel | None = None,
+    observables: Sequence[str | Sequence[int]] | None = None,
+    method: str = "auto",
+    seed_simulator: int | None = None,
+) -> np.ndarray:
+    """Execute several circuits in one job and calculate Z-type expectation values for each.
+
+    The circuits are transpiled in a single call and submitted as the PUBs of a single sampler job, so the backend
+    is set up once and Aer can run the experiments in parallel. Each value equals what `execute` returns for the
+    circuit on its own.
+
+    Args:
+        circuits: The quantum circuits to execute, without measurements.
+        backend: The Qiskit backend to run the circuits on.
+        shots: The number of measurement shots per circuit.
+        noise_model: An optional noise model to simulate, as in `execute`.
+        observables: Optional Z-type Pauli observables, as accepted by `z_expectation_values`, all evaluated from
+            the same shots.
+        method: The simulation method of the simulator created for a noise model: "auto" to let `select_method`
+            choose one for the batch, or an Aer method to override it. A backend passed without a noise model runs
+            the circuits as configured.
+        seed_simulator: The seed of the simulator for this job, or None to use the backend's setting.
+
+    Returns:
+        Without `observables`, the expectation values of the Z operator on the 0th qubit, in the order of `circuits`.
+        With `observables`, an array of shape (len(circuits), len(observables)).
+    """
+    if not circuits:
+        return _empty_values(observables)
+
+    execution_backend, compiled_circuits = _prepare_batch(circuits, backend, shots, noise_model, method)
+    sampler = SamplerV2(execution_backend)
+    if seed_simulator is not None:
+        sampler.options.simulator.seed_simulator = seed_simulator
+    result = sampler.run(compiled_circuits, shots=shots).result()
+    return _batch_values(result, observables)
+
+
+async def execute_async(
+    circuits: Sequence[QuantumCircuit],
+    backend: Backend,
+    shots: int,
+    noise_model: NoiseModel | None = None,
+    observables: Sequence[str | Sequence[int]] | None = None,
+    method: str = "auto",
+    executor: Executor | None = None,
+) -> np.ndarray:
+    """Asynchronous version of `execute_batch`.
+
+    The measurement and transpilation of the circuits run on `executor`, and the event loop waits for the sampler
+    job in a worker thread instead of blocking, so other coroutines can prepare their circuits while this batch is
+    simulated. Aer releases the GIL while simulating, so transpiling with the default thread pool overlaps with the
+    simulation; a `ProcessPoolExecutor` also overlaps the Python parts of transpilation.
+
+    Args:
+        circuits: The quantum circuits to execute, without measurements.
+        backend: The Qiskit backend to run the circuits on.
+        shots: The number of measurement shots per circuit.
+        noise_model: An optional noise model to simulate, as in `execute`.
+        observables: Optional Z-type Pauli observables, as in `execute_batch`.
+        method: The simulation method, as in `execute_batch`.
+        executor: The executor to transpile on, or None for the event loop's default thread pool.
+
+    Returns:
+        The expectation values, as returned by `execute_batch`.
+    """
+    if not circuits:
+        return _empty_values(observables)
+
+    loop = asyncio.get_running_loop()
+    execution_backend, compiled_circuits = await loop.run_in_executor(
+        executor, _prepare_batch, circuits, backend, shots, noise_model, method
+    )
+    job = SamplerV2(execution_backend).run(compiled_circuits, shots=shots)
+    result = await asyncio.to_thread(job.result)
+    return _batch_values(result, observables)
+
+
+async def execute_batches_async(
+    batches: Sequence[Sequence[QuantumCircuit]],
+    backend: Backend,
+    shots: int,
+    noise_model: NoiseModel | None = None,
+    observables: Sequence[str | Sequence[int]] | None = None,
+    method: str = "auto",
+    executor: Executor | None = None,
+    max_concurrency: int = 2,
+) -> list[np.ndarray]:
+    """Run `execute_async` on several batches, keeping at most `max_concurrency` of them in flight.
+
+    With the default of two, the next batch is transpiled while the previous one is simulated.
+
+    Args:
+        batches: The batches of quantum circuits to execute.
+        backend: The Qiskit backend to run the circuits on.
+        shots: The number of measurement shots per circuit.
+        noise_model: An optional noise model to simulate, as in `execute`.
+        observables: Optional Z-type Pauli observables, as in `execute_batch`.
+        method: The simulation method, as in `execute_batch`.
+        executor: The executor to transpile on, as in `execute_async`.
+        max_concurrency: The maximum number of batches being transpiled or simulated at once.
+
+    Returns:
+        The expectation values of every batch, in the order of `batches`.
+    """
+    if max_concurrency < 1:
+        raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}.")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(circuits: Sequence[QuantumCircuit]) -> np.ndarray:
+        async with semaphore:
+            return await execute_async(
+                circuits,
+                backend,
+                shots,
+                noise_model=noise_model,
+                observables=observables,
+                method=method,
+                executor=executor,
+            )
+
+    return list(await asyncio.gather(*(run(circuits) for circuits in batches)))
+
+
+def execute_batches(
+    batches: Sequence[Sequence[QuantumCircuit]],
+    backend: Backend,
+    shots: int,
+    noise_model: NoiseModel | None = None,
+    observables: Sequence[str | Sequence[int]] | None = None,
+    method: str = "auto",
+    executor: Executor | None = None,
+    max_concurrency: int = 2,
+) -> list[np.ndarray]:
+    """Run `execute_batches_async` to completion from synchronous code.
+
+    Args:
+        batches: The batches of quantum circuits to execute.
+        backend: The Qiskit backend to run the circuits on.
+        shots: The number of measurement shots per circuit.
+        noise_model: An optional noise model to simulate, as in `execute`.
+        observables: Optional Z-type Pauli observables, as in `execute_batch`.
+        method: The simulation method, as in `execute_batch`.
+        executor: The executor to transpile on, as in `execute_async`.
+        max_concurrency: The maximum number of batches being transpiled or simulated at once.
 
-    # If a noise model is provided, create a simulator with it; otherwise use the backend directly.
+    Returns:
+        The expectation values of every batch, in the order of `batches`.
+    """
+    return asyncio.run(
+        execute_batches_async(
+            batches,
+            backend,
+            shots,
+            noise_model=noise_model,
+            observables=observables,
+            method=method,
+            executor=executor,
+            max_concurrency=max_concurrency,
+        )
+    )
+
+
+@dataclass
+class AdaptiveEstimate:
+    """An expectation value estimated by `execute_adaptive`.
+
+    `standard_error` is the standard error of the mean over the `shots` used. `converged` is False when the shot
+    cap was reached before the target error.
+    """
+
+    value: float
+    standard_error: float
+    shots: int
+    converged: bool
+
+
+def execute_adaptive(
+    circuit: QuantumCircuit,
+    backend: Backend,
+    target_error: float,
+    noise_model: NoiseModel | None = None,
+    observable: str | Sequence[int] = (0,),
+    initial_shots: int = 1_000,
+    max_shots: int = 1_000_000,
+    method: str = "auto",
+    seed: int | np.random.Generator | None = None,
+) -> AdaptiveEstimate:
+    """Estimate a Z-type expectation value with as many shots as needed to reach a target standard error.
+
+    The circuit is transpiled once and sampled in chunks. Every shot of a Z-type observable is +1 or -1, so the
+    variance of a shot is 4 p (1 - p) for the probability p of +1. After n shots with n+ outcomes +1 and n- outcomes
+    -1, p is estimated as (n+ + 1) / (n + 2), the add-one (Laplace) estimate, and the standard error is the square
+    root of the variance 4 (n+ + 1)(n- + 1) / (n + 2)^2 over n. Unlike the plug-in sample variance, this is never
+    zero, so a rare outcome that is missing from the first chunk does not end the estimate early. After each chunk, the estimate stops if the standard error is at most `target_error`; otherwise the
+    next chunk is sized by the current variance to just reach the target, but no smaller than `initial_shots` and
+    never beyond `max_shots` in total.
+
+    Args:
+        circuit: The quantum circuit to execute, without measurements.
+        backend: The Qiskit backend to run the circuit on.
+        target_error: The standard error at which to stop.
+        noise_model: An optional noise model to simulate, as in `execute`.
+        observable: The Z-type observable, as accepted by `z_expectation_values`. Defaults to Z on qubit 0.
+        initial_shots: The number of shots of the first chunk, and the smallest chunk.
+        max_shots: The maximum total number of shots.
+        method: The simulation method, as in `execute_batch`.
+        seed: Seed or generator for the simulator seeds of the chunks, which keeps the chunks independent even if
+            the backend has a fixed `seed_simulator`.
+
+    Returns:
+        The estimate, its standard error and the number of shots used.
+    """
+    if target_error <= 0:
+        raise ValueError(f"The target error must be positive, got {target_error}.")
+    if not 2 <= initial_shots <= max_shots:
+        raise ValueError(f"Expected 2 <= initial_shots <= max_shots, got {initial_shots} and {max_shots}.")
+
+    rng = as_generator(seed)
+    execution_backend, compiled_circuits = _prepare_batch([circuit], backend, max_shots, noise_model, method)
+    sampler = SamplerV2(execution_backend)
+
+    total_shots = 0
+    total = 0.0
+    chunk = initial_shots
+    while True:
+        sampler.options.simulator.seed_simulator = int(rng.integers(2**31))
+        result = sampler.run(compiled_circuits, shots=chunk).result()
+        total += z_expectation_values(result[0].data.meas, [observable])[0] * chunk
+        total_shots += chunk
+
+        mean = float(total / total_shots)
+        plus_shots = total_shots * (1.0 + mean) / 2
+        minus_shots = total_shots - plus_shots
+        variance = 4 * (plus_shots + 1) * (minus_shots + 1) / (total_shots + 2) ** 2
+        standard_error = float(np.sqrt(variance / total_shots))
+        if standard_error <= target_error or total_shots >= max_shots:
+            return AdaptiveEstimate(
+                value=mean,
+                standard_error=standard_error,
+                shots=total_shots,
+                converged=standard_error <= target_error,
+            )
+
+        needed_shots = int(np.ceil(variance / target_error**2))
+        chunk = min(max(needed_shots - total_shots, initial_shots), max_shots - total_shots)
+
+
+def _prepare_batch(
+    circuits: Sequence[QuantumCircuit], backend: Backend, shots: int, noise_model: NoiseModel | None, method: str
+) -> tuple[Backend, list[QuantumCircuit]]:
+    """Choose the execution backend of a batch and return it with the measured, transpiled circuits."""
+    circuits_with_measurement = []
+    for circuit in circuits:
+        circuit_with_measurement = circuit.copy()
+        circuit_with_measurement.measure_all()
+        circuits_with_measurement.append(circuit_with_measurement)
+
+    # If a noise model is provided, use a pooled simulator with it; otherwise use the backend directly.
     if noise_model is not None:
-        execution_backend = AerSimulator(noise_model=noise_model)
+        choice = select_method(circuits, noise_model=noise_model, shots=shots, method=method)
+        execution_backend = get_simulator(method=choice.method, noise_model=noise_model)
     else:
         execution_backend = backend
 
-    # Transpile the circuit for the execution backend:
-    compiled_circuit = transpile(
-        circuit_with_measurement,
-        execution_backend,
-        optimization_level=0,
-    )
+    compiled_circuits = transpile(circuits_with_measurement, execution_backend, optimization_level=0)
+    return execution_backend, compiled_circuits
 
-    # Execute the circuit:
-    sampler = SamplerV2(execution_backend)
-    result = sampler.run([compiled_circuit], shots=shots).result()
-    counts = result[0].data.meas.get_counts()
-
-    # Calculate expectation value of Z on qubit 0.
-    total_counts = sum(counts.values())
-    expectation = 0.0
-    for outcome, count in counts.items():
-        # Reverse the outcome string due to Qiskit's little-endian ordering.
-        bitstring = outcome[::-1]
-        if bitstring[0] == "0":
-            expectation += count / total_counts
-        else:
-            expectation -= count / total_counts
-    return expectation
+
+def _batch_values(result: PrimitiveResult, observables: Sequence[str | Sequence[int]] | None) -> np.ndarray:
+    """Return the expectation values of a batch from its sampler result."""
+    evaluated = [[0]] if observables is None else observables
+    values = np.array([z_expectation_values(pub_result.data.meas, evaluated) for pub_result in result], dtype=float)
+    return values[:, 0] if observables is None else values
+
+
+def _empty_values(observables: Sequence[str | Sequence[int]] | None) -> np.ndarray:
+    """Return the expectation values of an empty batch."""
+    return np.zeros((0,) if observables is None else (0, len(observables)), dtype=float)
+
+
+def z_expectation_values(bit_array: BitArray, observables: Sequence[str | Sequence[int]]) -> np.ndarray:
+    """Calculate expectation values of Z-type Pauli observables from sampled bits.
+
+    The value of a product of Z operators in one shot is +1 or -1 by the parity of the bits it acts on. The parities
+    are computed on the packed bytes of the `BitArray`: masking the bytes, XOR-ing them together and looking up the
+    parity of the remaining byte, so no bitstrings are ever formed.
+
+    Args:
+        bit_array: The sampled bits, e.g. `pub_result.data.meas` of a sampler result.
+        observables: The observables, each given either as a Pauli label of "Z" and "I" characters in Qiskit order
+            (the rightmost character acts on bit 0), e.g. "ZIZ", or as the indices of the bits it acts on, e.g.
+            [0, 2]. An empty observable is the identity.
+
+    Returns:
+        The expectation value of each observable, averaged over the shots.
+    """
+    num_bytes = bit_array.array.shape[-1]
+    bytes_per_shot = bit_array.array.reshape(-1, num_bytes)
+    expectations = np.empty(len(observables), dtype=float)
+    for idx, observable in enumerate(observables):
+        mask = np.zeros(num_bytes, dtype=np.uint8)
+        for bit in _z_observable_bits(observable, bit_array.num_bits):
+            # Bytes are big-endian: bit 0 is the lowest bit of the last byte.
+            mask[num_bytes - 1 - bit // 8] ^= np.uint8(1 << (bit % 8))
+        parities = _BYTE_PARITY[np.bitwise_xor.reduce(bytes_per_shot & mask, axis=-1)]
+        expectations[idx] = 1.0 - 2.0 * parities.mean()
+    return expectations
+
+
+def _z_observable_bits(observable: str | Sequence[int], num_bits: int) -> list[int]:
+    """Return the indices of the bits a Z-type observable acts on."""
+    if isinstance(observable, str):
+        if len(observable) != num_bits or set(observable) - {"I", "Z"}:
+            raise ValueError(f"Observable '{observable}' is not a label of {num_bits} 'I' and 'Z' characters.")
+        return [bit for bit, pauli in enumerate(reversed(observable)) if pauli == "Z"]
+
+    bits = [int(bit) for bit in observable]
+    if any(bit < 0 or bit >= num_bits for bit in bits):
+        raise ValueError(f"Observable {list(observable)} acts on bits outside of the {num_bits} measured bits.")
+    return bits
 
 
 def execute_no_shot_noise(
-    qc: QuantumCircuit, noise_model: NoiseModel | None = None, return_density_matrix: bool = False
+    qc: QuantumCircuit,
+    noise_model: NoiseModel | None = None,
+    return_density_matrix: bool = False,
+    method: str = "auto",
 ) -> tuple[float, np.ndarray | None]:
-    """Executor that uses density matrix simulator to reduce all shot noise.
+    """Executor that simulates the exact output state to remove all shot noise.
 
     Adapted from the `execute_with_noise` function from mitiq.
     https://github.com/unitaryfund/mitiq/blob/ee85edf48557c85c4f6d0b1e1d74d74fc882c9d4/mitiq/interface/mitiq_qiskit/qiskit_utils.py#L85
 
+    Only the probability of the all-zeros outcome, rho[0, 0], is saved, so the 4^n density matrix is neither formed
+    for noiseless circuits nor returned from the simulator unless `return_density_matrix` is set. The simulation
+    method comes from `select_method`: noiseless circuits run as stabilizer states, matrix product states or
+    statevectors, and noisy circuits need the density matrix method for an exact result.
+
     Args:
         qc: The quantum circuit to execute.
         noise_model: The noise model to apply, if any.
-        return_density_matrix: Whether to include the density matrix in the result.
+        return_density_matrix: Whether to include the density matrix in the result. This always runs the density
+            matrix simulator.
+        method: "auto" to let `select_method` choose the simulation method, or an Aer method to override it.
 
     Returns:
         A tuple containing:
-        - The expectation value of the Z operator on qubit 0.
+        - The probability of the all-zeros outcome, rho[0, 0].
         - The density matrix, or None if `return_density_matrix` is False.
     """
     qc = qc.copy()
-    qc.save_density_matrix()
+    if return_density_matrix:
+        qc.save_density_matrix()
+        method = "density_matrix"
+    else:
+        # The method is chosen before the save instruction is added, which is neither a Clifford gate nor free of
+        # entanglement as far as `select_method` can tell.
+        method = select_method(qc, noise_model=noise_model, method=method).method
+        qc.save_amplitudes_squared([0])
 
-    # Create the density matrix simulator with the noise model.
     # The backend already knows about the noise model's basis gates, so we don't need to pass them separately.
-    backend = AerSimulator(method="density_matrix", noise_model=noise_model)
-    job = backend.run(qc, optimization_level=0, shots=1)
-
-    rho = np.asarray(job.result().data()["density_matrix"])
-    expectation_value = float(rho[0, 0].real)
+    backend = get_simulator(method=method, noise_model=noise_model)
+    data = backend.run(qc, optimization_level=0, shots=1).result().data()
 
     if return_density_matrix:
-        return expectation_value, rho
-    return expectation_value, None
+        rho = np.asarray(data["density_matrix"])
+        return float(rho[0, 0].real), rho
+    return float(data["amplitudes_squared"][0]), None
@@ -1,26 +1,49 @@
 """Recipe steps from arXiv:2311.03805"""
 
-import random
+import functools
+import itertools
+import multiprocessing
+import os
 import warnings
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from typing import Any
 
 import numpy as np
-from qiskit import QuantumCircuit, transpile
+from qiskit import QuantumCircuit
+from qiskit.circuit import CircuitInstruction
 from qiskit.circuit.equivalence_library import SessionEquivalenceLibrary
-from qiskit.circuit.library import UnitaryGate
-from qiskit.quantum_info import Operator, random_unitary
-from qiskit.transpiler import PassManager
+from qiskit.circuit.library import CXGate, UnitaryGate
+from qiskit.quantum_info import Operator
+from qiskit.synthesis import OneQubitEulerDecomposer, TwoQubitBasisDecomposer, qs_decomposition
+from qiskit.transpiler import PassManager, generate_preset_pass_manager
 from qiskit.transpiler.passes import (
     BasisTranslator,
     Decompose,
+    ElidePermutations,
+    Split2QUnitaries,
     UnrollCustomDefinitions,
 )
 
+from unopt.gate_index import TwoQubitGateIndex
+from unopt.profiling import RecipeProfiler
+from unopt.sampling import UnitaryPool, spawn_generators
+from unopt.serialization import dump_circuit, load_circuit
+from unopt.verification import verify_equivalence
+
+
 def unoptimize_circuit(
     qc: QuantumCircuit,
     iterations: int = 1,
     strategy: str = "concatenated",
     decomposition_method: str = "default",
+    sites_per_iteration: int = 1,
+    seed: int | np.random.Generator | None = None,
+    synthesis: str = "full",
+    synthesize_every: int = 1,
+    verify: bool = False,
+    profiler: RecipeProfiler | None = None,
 ) -> QuantumCircuit:
     """Apply the elementary recipe to a quantum circuit multiple times.
 
@@ -28,238 +51,673 @@ def unoptimize_circuit(
         qc: The input quantum circuit.
         iterations: The number of times to apply the recipe.
         strategy: The strategy used in gate insertion. Options are "concatenated" or "random".
+        decomposition_method: The decomposition method passed to `decompose`.
+        sites_per_iteration: The number of A† A insertions per iteration. All sites are swapped before a single
+            decomposition and synthesis, so larger values give more noise scaling per transpile.
+        seed: Seed or generator for the random gates A and the random strategy. Runs with the same integer seed
+            produce the same circuit.
+        synthesis: How steps 3 and 4 are applied. Options are:
+                - "full": Decompose and synthesize the whole circuit.
+                - "window": Decompose and synthesize only the window of each site (the conjugated A†, B1 and A) with
+                  `synthesize_window`, leaving every other gate untouched. The windows come out in the `cx`/`u3`
+                  basis, so the result is a `cx`/`u3` circuit only if the input circuit is.
+        synthesize_every: With "full" synthesis, run steps 3 and 4 only every `synthesize_every` iterations and once
+            more at the end; steps 1 and 2 run every iteration on the partially unsynthesized circuit. The result is
+            still a `cx`/`u3` circuit with the same unitary, for fewer transpiles. Since a single synthesis then
+            optimizes several iterations' worth of gates together, depth grows somewhat slower per iteration.
+        verify: Debug flag. If True, check the result against `qc` with `verify_equivalence` and raise a RuntimeError
+            if they differ.
+        profiler: A `RecipeProfiler` that records wall time, gate count, depth and peak allocation for each stage of
+            each iteration.
 
     Returns:
         new_qc: The quantum circuit after applying the recipe.
     """
+    _check_recipe_options(synthesis, synthesize_every)
+
+    new_qc, pending = qc.copy(), False
+    profiler = profiler if profiler is not None else RecipeProfiler(enabled=False)
+    recipe = _apply_recipe(
+        qc, strategy, decomposition_method, sites_per_iteration, seed, synthesis, synthesize_every, profiler
+    )
+    for new_qc, pending in itertools.islice(recipe, iterations):
+        pass
+    new_qc = _finish_synthesis(new_qc, pending, decomposition_method, profiler, iterations)
+
+    if verify:
+        result = verify_equivalence(qc, new_qc)
+        if not result:
+            raise RuntimeError(
+                f"The unoptimized circuit is not equivalent to the input circuit (overlaps {result.overlaps})."
+            )
+    return new_qc
+
+
+@dataclass
+class LadderRung:
+    """An unoptimized circuit yielded by `unoptimize_ladder`, with its metrics."""
+
+    iterations: int
+    circuit: QuantumCircuit
+    depth: int
+    count_ops: dict[str, int]
+
+
+def unoptimize_ladder(
+    qc: QuantumCircuit,
+    iterations: Iterable[int],
+    strategy: str = "concatenated",
+    decomposition_method: str = "default",
+    sites_per_iteration: int = 1,
+    seed: int | np.random.Generator | None = None,
+    synthesis: str = "full",
+    synthesize_every: int = 1,
+) -> Iterator[LadderRung]:
+    """Apply the elementary recipe once and yield the circuit after each requested number of iterations.
+
+    Unlike calling `unoptimize_circuit` once per iteration count, the rungs are nested: the circuit for `k` iterations
+    is the circuit for the previous rung with more iterations applied. A sweep up to `R` iterations therefore costs `R`
+    iterations in total instead of `R (R + 1) / 2`.
+
+    Args:
+        qc: The input quantum circuit.
+        iterations: The iteration counts to yield circuits for. They are visited in increasing order, without
+            duplicates; 0 yields a copy of `qc`.
+        strategy: The strategy used in gate insertion. Options are "concatenated" or "random".
+        decomposition_method: The decomposition method passed to `decompose`.
+        sites_per_iteration: The number of A† A insertions per iteration.
+        seed: Seed or generator for the random gates A and the random strategy.
+        synthesis: How steps 3 and 4 are applied. Options are "full" or "window", see `unoptimize_circuit`.
+        synthesize_every: How often steps 3 and 4 run with "full" synthesis, see `unoptimize_circuit`. Rungs that fall
+            between two syntheses are synthesized on their own copy, which does not change later rungs.
+
+    Yields:
+        One `LadderRung` per requested iteration count, in increasing order.
+    """
+    _check_recipe_options(synthesis, synthesize_every)
+    rungs = sorted(set(iterations))
+    if rungs and rungs[0] < 0:
+        raise ValueError("Iteration counts must be non-negative.")
+
+    recipe = _apply_recipe(
+        qc,
+        strategy,
+        decomposition_method,
+        sites_per_iteration,
+        seed,
+        synthesis,
+        synthesize_every,
+        RecipeProfiler(enabled=False),
+    )
+    current, pending = qc, False
+    done = 0
+    for target in rungs:
+        for current, pending in itertools.islice(recipe, target - done):
+            pass
+        done = target
+
+        # The recipe keeps editing its working circuit, so every rung gets its own copy.
+        circuit = _finish_synthesis(
+            current.copy(), pending, decomposition_method, RecipeProfiler(enabled=False), target
+        )
+        yield LadderRung(iterations=target, circuit=circuit, depth=circuit.depth(), count_ops=dict(circuit.count_ops()))
+
+
+@dataclass
+class ScaledCircuit:
+    """An unoptimized circuit returned by `unoptimize_to_scale`, with the scale factor it reached."""
+
+    target_scale: float
+    scale_factor: float
+    iterations: int
+    circuit: QuantumCircuit
+
+
+def unoptimize_to_scale(
+    qc: QuantumCircuit,
+    target_scale: float,
+    metric: str = "depth",
+    tolerance: float = 0.05,
+    max_iterations: int = 100,
+    **kwargs: Any,
+) -> ScaledCircuit:
+    """Apply the elementary recipe until the circuit reaches a requested scale factor.
+
+    Args:
+        qc: The input quantum circuit.
+        target_scale: The requested scale factor λ, the ratio of the metric after and before unoptimization.
+        metric: The metric λ is measured in: "depth" or "gate_count" (`QuantumCircuit.size`). For gate counts
+            comparable with the `cx`/`u3` output of the recipe, pass a circuit already in that basis.
+        tolerance: The circuit is accepted as soon as λ >= target_scale - tolerance.
+        max_iterations: The maximum number of iterations to apply. If the target is not reached by then, a warning
+            is issued and the last circuit is returned.
+        **kwargs: Keyword arguments of `unoptimize_ladder`, such as `strategy` or `seed`.
+
+    Returns:
+        The unoptimized circuit with the scale factor it actually reached and the iterations it took.
+    """
+    return unoptimize_to_scales(qc, [target_scale], metric, tolerance, max_iterations, **kwargs)[0]
+
+
+def unoptimize_to_scales(
+    qc: QuantumCircuit,
+    target_scales: Sequence[float],
+    metric: str = "depth",
+    tolerance: float = 0.05,
+    max_iterations: int = 100,
+    **kwargs: Any,
+) -> list[ScaledCircuit]:
+    """Unoptimize a circuit to each scale factor of a grid, with a single run of the recipe.
+
+    The circuits are rungs of one `unoptimize_ladder`, so a ZNE grid such as `scale_factors_zne` costs no more
+    iterations than its largest scale factor. Iteration stops as soon as the largest target is reached.
+
+    Args:
+        qc: The input quantum circuit.
+        target_scales: The requested scale factors, in any order.
+        metric: The metric the scale factors are measured in, see `unoptimize_to_scale`.
+        tolerance: A target counts as reached once λ >= target - tolerance.
+        max_iterations: The maximum number of iterations to apply, see `unoptimize_to_scale`.
+        **kwargs: Keyword arguments of `unoptimize_ladder`, such as `strategy` or `seed`.
+
+    Returns:
+        One `ScaledCircuit` per target scale, in the order of `target_scales`.
+    """
+    if metric == "depth":
+        measure = QuantumCircuit.depth
+    elif metric == "gate_count":
+        measure = QuantumCircuit.size
+    else:
+        raise ValueError(f"Unknown metric '{metric}'. Available metrics are 'depth' and 'gate_count'.")
+    if max_iterations < 0:
+        raise ValueError("max_iterations must be non-negative.")
+    baseline = measure(qc)
+    if baseline == 0:
+        raise ValueError("Cannot scale an empty circuit.")
+
+    results: dict[int, ScaledCircuit] = {}
+    remaining = sorted(range(len(target_scales)), key=lambda idx: target_scales[idx])
+    rung = None
+    for rung in unoptimize_ladder(qc, range(max_iterations + 1), **kwargs):
+        scale_factor = measure(rung.circuit) / baseline
+        while remaining and scale_factor >= target_scales[remaining[0]] - tolerance:
+            idx = remaining.pop(0)
+            results[idx] = ScaledCircuit(target_scales[idx], scale_factor, rung.iterations, rung.circuit)
+        if not remaining:
+            break
+
+    if remaining and rung is not None:
+        warnings.warn(
+            f"Reached a scale factor of {scale_factor:.3g} after {max_iterations} iterations, below the targets "
+            f"{sorted(target_scales[idx] for idx in remaining)}."
+        )
+        for idx in remaining:
+            results[idx] = ScaledCircuit(target_scales[idx], scale_factor, rung.iterations, rung.circuit)
+    return [results[idx] for idx in range(len(target_scales))]
+
+
+def unoptimize_many(
+    circuits: Sequence[QuantumCircuit],
+    iterations: int = 1,
+    strategy: str = "concatenated",
+    seeds: int | np.random.Generator | Sequence[int] | np.ndarray | None = None,
+    max_workers: int | None = None,
+    decomposition_method: str = "default",
+    sites_per_iteration: int = 1,
+    synthesis: str = "full",
+    synthesize_every: int = 1,
+) -> list[QuantumCircuit]:
+    """Unoptimize many circuits in parallel on a process pool.
+
+    Circuits travel to and from the workers as QPY payloads rather than pickled objects. Every circuit is unoptimized
+    with its own random stream, so the results do not depend on the number of workers or on scheduling. Workers are
+    started with the "spawn" method, so each pays the import cost of this module once; the pool pays off for batches
+    that take at least a few seconds.
+
+    Args:
+        circuits: The input quantum circuits. Pass the same circuit several times to generate several variants.
+        iterations: The number of recipe iterations applied to every circuit.
+        strategy: The strategy used in gate insertion. Options are "concatenated" or "random".
+        seeds: Either one seed per circuit (a sequence or array of integers), or a master seed (or generator) from
+            which one independent stream per circuit is spawned with `spawn_generators`. None draws fresh OS entropy.
+        max_workers: The number of worker processes. None uses one per CPU; 1 runs in the calling process.
+        decomposition_method: The decomposition method passed to `decompose`.
+        sites_per_iteration: The number of A† A insertions per iteration.
+        synthesis: How steps 3 and 4 are applied, see `unoptimize_circuit`.
+        synthesize_every: How often steps 3 and 4 run with "full" synthesis, see `unoptimize_circuit`.
+
+    Returns:
+        The unoptimized circuits, in the order of `circuits`.
+    """
+    _check_recipe_options(synthesis, synthesize_every)
+    if isinstance(seeds, (Sequence, np.ndarray)):
+        if len(seeds) != len(circuits):
+            raise ValueError(f"Expected {len(circuits)} seeds, one per circuit, but got {len(seeds)}.")
+        streams: Sequence[int | np.random.Generator] = [int(seed) for seed in seeds]
+    else:
+        streams = spawn_generators(seeds, len(circuits))
+
+    options = {
+        "iterations": iterations,
+        "strategy": strategy,
+        "decomposition_method": decomposition_method,
+        "sites_per_iteration": sites_per_iteration,
+        "synthesis": synthesis,
+        "synthesize_every": synthesize_every,
+    }
+    jobs = [(dump_circuit(qc), stream, options) for qc, stream in zip(circuits, streams)]
+
+    if max_workers == 1 or len(jobs) <= 1:
+        payloads = [_unoptimize_job(job) for job in jobs]
+    else:
+        num_workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (4 * num_workers))
+        # Forking a process that has already run Qiskit's multithreaded transpiler can deadlock, so workers are spawned.
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            payloads = list(executor.map(_unoptimize_job, jobs, chunksize=chunksize))
+    return [load_circuit(payload) for payload in payloads]
+
+
+def _unoptimize_job(job: tuple[bytes, int | np.random.Generator, dict[str, Any]]) -> bytes:
+    """Worker entry point of `unoptimize_many`: unoptimize one QPY-encoded circuit and return it QPY-encoded."""
+    payload, seed, options = job
+    return dump_circuit(unoptimize_circuit(load_circuit(payload), seed=seed, **options))
+
+
+def _check_recipe_options(synthesis: str, synthesize_every: int) -> None:
+    """Raise a ValueError for unknown synthesis modes or invalid synthesis intervals."""
+    if synthesis not in ("full", "window"):
+        raise ValueError(f"Unknown synthesis mode '{synthesis}'. Available modes are 'full' and 'window'.")
+    if synthesize_every < 1:
+        raise ValueError("synthesize_every must be a positive integer.")
+    if synthesis == "window" and synthesize_every != 1:
+        raise ValueError("Window synthesis resynthesizes every site right away; synthesize_every must be 1.")
+
+
+def _finish_synthesis(
+    qc: QuantumCircuit, pending: bool, decomposition_method: str, profiler: RecipeProfiler, iteration: int
+) -> QuantumCircuit:
+    """Run the deferred steps 3 and 4 on a circuit that still holds unsynthesized recipe gates."""
+    if not pending:
+        return qc
+    with profiler.stage(iteration, "decompose") as stage:
+        qc = stage.circuit = decompose(qc, method=decomposition_method)
+    with profiler.stage(iteration, "synthesize") as stage:
+        qc = stage.circuit = synthesize(qc)
+    return qc
+
+
+def _apply_recipe(
+    qc: QuantumCircuit,
+    strategy: str,
+    decomposition_method: str,
+    sites_per_iteration: int,
+    seed: int | np.random.Generator | None,
+    synthesis: str,
+    synthesize_every: int,
+    profiler: RecipeProfiler,
+) -> Iterator[tuple[QuantumCircuit, bool]]:
+    """Apply the elementary recipe to a copy of `qc` indefinitely, yielding the working circuit after each iteration.
+
+    Each item also says whether the circuit holds gates that still need steps 3 and 4 (see `_finish_synthesis`). The
+    yielded circuit may be edited in place by later iterations. Every stage is run under `profiler`.
+    """
     new_qc = qc.copy()
-    for _ in range(iterations):
+    index = TwoQubitGateIndex.from_circuit(new_qc)
+    unitary_pool = UnitaryPool(seed)
+    pending = False
+    for iteration in itertools.count(1):
         # Step 1: Gate Insertion:
-        new_qc, B1_info = insert(new_qc, strategy)
+        with profiler.stage(iteration, "insert") as stage:
+            new_qc, B1_infos = insert_many(
+                new_qc, sites_per_iteration, strategy, index=index, inplace=True, unitary_pool=unitary_pool
+            )
+            stage.circuit = new_qc
 
         # If insertion failed (no suitable gates found), skip this iteration
-        if B1_info is None:
+        if not B1_infos:
             warnings.warn("Skipping unoptimization iteration due to failed gate insertion.")
+            yield new_qc, pending
             continue
 
         # Step 2: Gate Swapping:
-        new_qc = swap(new_qc, B1_info)
+        with profiler.stage(iteration, "swap") as stage:
+            new_qc = stage.circuit = swap_many(new_qc, B1_infos, index=index, inplace=True)
+
+        if synthesis == "window":
+            # Steps 3 and 4 on the three instructions each site now spans, from the last site backwards so that the
+            # positions of earlier sites stay valid.
+            with profiler.stage(iteration, "synthesize_window") as stage:
+                for B1_info in reversed(B1_infos):
+                    start = B1_info["index"]
+                    new_qc = synthesize_window(
+                        new_qc, start, start + 3, decomposition_method=decomposition_method, index=index, inplace=True
+                    )
+                stage.circuit = new_qc
+            yield new_qc, False
+            continue
+
+        # Defer steps 3 and 4 until the next multiple of synthesize_every; the index stays in sync through splices.
+        if iteration % synthesize_every:
+            yield new_qc, True
+            continue
 
         # Step 3: Decomposition:
-        new_qc = decompose(new_qc, method=decomposition_method)
+        with profiler.stage(iteration, "decompose") as stage:
+            new_qc = stage.circuit = decompose(new_qc, method=decomposition_method)
 
         # Step 4: Synthesis:
-        new_qc = synthesize(new_qc)
+        with profiler.stage(iteration, "synthesize") as stage:
+            new_qc = stage.circuit = synthesize(new_qc)
 
-    return new_qc
+        # Synthesis re-emits every instruction, so the index is rebuilt for the synthesized circuit.
+        with profiler.stage(iteration, "index") as stage:
+            index = TwoQubitGateIndex.from_circuit(new_qc)
+            stage.circuit = new_qc
+        yield new_qc, False
 
 
-def insert(qc: QuantumCircuit, strategy: str = "concatenated") -> QuantumCircuit:
+def insert(
+    qc: QuantumCircuit,
+    strategy: str = "concatenated",
+    index: TwoQubitGateIndex | None = None,
+    inplace: bool = False,
+    seed: int | np.random.Generator | None = None,
+) -> QuantumCircuit:
     """Insert a two-qubit gate A and its Hermitian conjugate A† between two gates B1 and B2.
 
     Args:
         qc: The input quantum circuit.
         strategy: The strategy to select the pair of two-qubit gates. Options are "concatenated" or "random".
+        index: The two-qubit gate index of `qc`. Built from `qc` if not given; otherwise it is updated in place to
+            describe the returned circuit.
+        inplace: If True, splice A and A† into `qc` itself instead of a copy.
+        seed: Seed or generator for the random gate A and the random strategy.
 
     Returns:
         new_qc: The modified quantum circuit with A and A† inserted.
         B1_info: Information about gate B1 (index, qubits, gate).
     """
-    # Collect all two-qubit gates with their indices and qubits
-    two_qubit_gates: list[QuantumCircuit] = []
+    new_qc, B1_infos = insert_many(qc, num_sites=1, strategy=strategy, index=index, inplace=inplace, seed=seed)
+    if not B1_infos:
+        return qc, None  # Return the original circuit unmodified
+    return new_qc, B1_infos[0]
+
+
+def insert_many(
+    qc: QuantumCircuit,
+    num_sites: int,
+    strategy: str = "concatenated",
+    index: TwoQubitGateIndex | None = None,
+    inplace: bool = False,
+    seed: int | np.random.Generator | None = None,
+    unitary_pool: UnitaryPool | None = None,
+) -> tuple[QuantumCircuit, list[dict[str, Any]]]:
+    """Insert A† A pairs after up to `num_sites` distinct B1 gates in a single pass.
 
-    for idx, instruction in enumerate(qc.data):
-        instr = instruction.operation
-        qargs = instruction.qubits
-        cargs = instruction.clbits
+    Each site is a (B1, shared qubit, third qubit) triple chosen as in `insert`. Sites never share their B1 gate, so
+    the insertions and the swaps that follow are independent of each other.
 
-        if len(qargs) == 2:
-            qubit_indices = [qc.find_bit(qarg).index for qarg in qargs]
-            two_qubit_gates.append({"index": idx, "qubits": qubit_indices, "gate": instr})
+    Args:
+        qc: The input quantum circuit.
+        num_sites: The maximum number of insertion sites.
+        strategy: The strategy to select the B1 gates. Options are "concatenated" or "random".
+        index: The two-qubit gate index of `qc`. Built from `qc` if not given; otherwise it is updated in place to
+            describe the returned circuit.
+        inplace: If True, splice the gates into `qc` itself instead of a copy.
+        seed: Seed or generator for the random gates A and the random strategy. Ignored if `unitary_pool` is given.
+        unitary_pool: Pool the gates A are drawn from, whose generator also drives the random strategy. Passing the
+            same pool across calls avoids re-sampling a batch of unitaries each time.
 
-    found_pair = False
-    B1_idx = B1_qubits = B1_gate = shared_qubit = None
+    Returns:
+        new_qc: The modified quantum circuit with the A and A† gates inserted.
+        B1_infos: Information about each site, ordered by the position of B1 in `new_qc`.
+    """
+    if index is None:
+        index = TwoQubitGateIndex.from_circuit(qc)
+    if unitary_pool is None:
+        unitary_pool = UnitaryPool(seed, size=max(num_sites, 1))
 
     if strategy == "concatenated":
-        # Strategy concatenated: Find a pair of gates that share a common qubit
-        for i in range(len(two_qubit_gates)):
-            for j in range(i + 1, len(two_qubit_gates)):
-                qubits_i = set(two_qubit_gates[i]["qubits"])
-                qubits_j = set(two_qubit_gates[j]["qubits"])
-                common_qubits = qubits_i & qubits_j
-
-                if len(common_qubits) == 1:
-                    B1_idx = two_qubit_gates[i]["index"]
-                    B1_qubits = two_qubit_gates[i]["qubits"]
-                    B1_gate = two_qubit_gates[i]["gate"]
-                    shared_qubit = list(common_qubits)[0]
-                    found_pair = True
-                    break
-
-            if found_pair:
-                break
+        # Strategy concatenated: Take the first gates that share exactly one qubit with a later gate
+        candidates, shared_qubits = index.concatenated_candidates()
+        gate_ids = candidates[:num_sites].tolist()
+        shared = shared_qubits[:num_sites].tolist()
 
     elif strategy == "random":
-        # Strategy random: Randomly select a two-qubit gate as B1
-        if two_qubit_gates:
-            gate_info = random.choice(two_qubit_gates)
-            B1_idx = gate_info["index"]
-            B1_qubits = gate_info["qubits"]
-            B1_gate = gate_info["gate"]
-            shared_qubit = B1_qubits[0]  # Choose the first qubit as shared
-            found_pair = True
+        # Strategy random: Randomly select distinct two-qubit gates as B1, sharing their first qubit
+        gate_ids = sorted(unitary_pool.rng.choice(len(index), min(num_sites, len(index)), replace=False).tolist())
+        shared = [int(index.qubits[gate_id][0]) for gate_id in gate_ids]
     else:
         raise ValueError(f"Unknown strategy '{strategy}'. Available strategies are 'concatenated' and 'random'.")
 
-    if not found_pair or B1_idx is None or B1_qubits is None:
+    if not gate_ids:
         warnings.warn("No suitable pair of two-qubit gates found. Skipping gate insertion.")
-        return qc, None  # Return the original circuit unmodified
-
-    # Generate a random two-qubit unitary A and its adjoint A†
-    A = random_unitary(4)
-    A_dag = A.adjoint()
-
-    if B1_qubits is None:
-        warnings.warn("B1_qubits is None. Skipping gate insertion.")
-        return qc, None  # Return the original circuit unmodified
-
-    # Choose qubits for A and A† insertion
-    all_qubits = set(range(qc.num_qubits))
-    other_qubits = list(all_qubits - set(B1_qubits))
+        return qc, []
 
-    if not other_qubits:
+    if qc.num_qubits < 3:
         warnings.warn("Not enough qubits to perform gate insertion. Skipping.")
-        return qc, None  # Return the original circuit unmodified
+        return qc, []
+
+    # Gather every site before editing the circuit, in the order of the B1 gates
+    B1_infos = []
+    for gate_id, shared_qubit in zip(gate_ids, shared):
+        B1_idx = int(index.positions[gate_id])
+        B1_qubits = index.qubits[gate_id].tolist()
+
+        # Draw a random two-qubit unitary A and its adjoint A†
+        A = unitary_pool.draw()
+
+        # Choose the third qubit for A and A† insertion
+        other_qubits = list(set(range(qc.num_qubits)) - set(B1_qubits))
+        B1_infos.append(
+            {
+                "index": B1_idx,
+                "qubits": B1_qubits,
+                "gate": qc.data[B1_idx].operation,
+                "shared_qubit": shared_qubit,
+                "third_qubit": other_qubits[0],
+                "A": A,
+                "A_dag": A.conj().T,
+            }
+        )
+
+    # Edit a copy of the circuit unless asked to work in place
+    new_qc = qc if inplace else qc.copy()
+
+    # Insert from the last site backwards so that the positions of earlier sites stay valid
+    for B1_info in reversed(B1_infos):
+        B1_idx = B1_info["index"]
+        qubit_pair = [B1_info["shared_qubit"], B1_info["third_qubit"]]
+
+        # Insert A†, A on qubits [shared_qubit, third_qubit], directly after B1
+        qubits_for_A = tuple(new_qc.qubits[q] for q in qubit_pair)
+        new_qc.data.insert(
+            B1_idx + 1, CircuitInstruction(UnitaryGate(B1_info["A"], label="A", check_input=False), qubits_for_A)
+        )
+        new_qc.data.insert(
+            B1_idx + 1,
+            CircuitInstruction(UnitaryGate(B1_info["A_dag"], label=r"$A^{\dagger}$", check_input=False), qubits_for_A),
+        )
+        index.splice(B1_idx + 1, B1_idx + 1, [qubit_pair] * 2)
+
+    # Every earlier site shifted B1 by the two gates inserted before it
+    for offset, B1_info in enumerate(B1_infos):
+        B1_info["index"] += 2 * offset
+
+    return new_qc, B1_infos
+
+
+def swap(
+    qc: QuantumCircuit,
+    B1_info: dict[str, Any],
+    index: TwoQubitGateIndex | None = None,
+    inplace: bool = False,
+) -> QuantumCircuit:
+    r"""Swap the B1 gate with the A† gate in the circuit, replacing A† with \widetilde{A^\dagger}.
 
-    third_qubit = other_qubits[0]
-    if shared_qubit is None:
-        warnings.warn("Shared qubit is None. Skipping gate insertion.")
-        return qc, None  # Return the original circuit unmodified
+    Args:
+        qc: The input quantum circuit.
+        B1_info: Information about gate B1, including its index, qubits, and the A, A† gates.
+        index: The two-qubit gate index of `qc`, updated in place to describe the returned circuit.
+        inplace: If True, replace B1 and A† in `qc` itself instead of a copy.
 
-    # Map indices back to qubits
-    qubit_map = {qc.find_bit(q).index: q for q in qc.qubits}
-
-    # Create a new circuit and insert A and A†
-    new_qc = QuantumCircuit(*qc.qregs, *qc.cregs)
-
-    # Copy the gates up to and including B1
-    for instruction in qc.data[: B1_idx + 1]:
-        instr = instruction.operation
-        qargs = instruction.qubits
-        cargs = instruction.clbits
-        new_qc.append(instr, qargs, cargs)
-
-    # Insert A on qubits [shared_qubit, third_qubit]
-    qubits_for_A = [qubit_map[shared_qubit], qubit_map[third_qubit]]
-
-    # Insert A†, A on the same qubits
-    new_qc.unitary(A_dag, qubits_for_A, label=r"$A^{\dagger}$")
-    new_qc.unitary(A, qubits_for_A, label="A")
-
-    # Copy the remaining gates
-    for instruction in qc.data[B1_idx + 1 :]:
-        instr = instruction.operation
-        qargs = instruction.qubits
-        cargs = instruction.clbits
-        new_qc.append(instr, qargs, cargs)
-
-    # Prepare B1_info for gate_swap function.
-    B1_info = {
-        "index": B1_idx,
-        "qubits": B1_qubits,
-        "gate": B1_gate,
-        "shared_qubit": shared_qubit,
-        "third_qubit": third_qubit,
-        "A": A,
-        "A_dag": A_dag,
-    }
+    Returns:
+        The modified quantum circuit with B1 and A† swapped.
+    """
+    qubits_involved, B1_positions, A_dagger_positions = _conjugation_layout(B1_info)
+    widetilde_A_dagger = conjugate_unitaries(
+        Operator(B1_info["gate"]).data, B1_info["A_dag"], B1_positions, A_dagger_positions
+    )
+
+    # Edit a copy of the circuit unless asked to work in place.
+    new_qc = qc if inplace else qc.copy()
+    _replace_with_conjugated(new_qc, B1_info, widetilde_A_dagger, qubits_involved, index)
+    return new_qc
 
-    return new_qc, B1_info
 
+def swap_many(
+    qc: QuantumCircuit,
+    B1_infos: list[dict[str, Any]],
+    index: TwoQubitGateIndex | None = None,
+    inplace: bool = False,
+) -> QuantumCircuit:
+    r"""Apply `swap` at every site returned by `insert_many`.
 
-def swap(qc: QuantumCircuit, B1_info: dict[str, Any]) -> QuantumCircuit:
-    r"""Swap the B1 gate with the A† gate in the circuit, replacing A† with \widetilde{A^\dagger}.
+    The \widetilde{A^\dagger} matrices of all sites are computed with one batched `conjugate_unitaries` call per
+    distinct qubit layout.
 
     Args:
         qc: The input quantum circuit.
-        B1_info: Information about gate B1, including its index, qubits, and the A, A† gates.
+        B1_infos: Information about each site, as returned by `insert_many`.
+        index: The two-qubit gate index of `qc`, updated in place to describe the returned circuit.
+        inplace: If True, edit `qc` itself instead of a copy.
 
     Returns:
-        The modified quantum circuit with B1 and A† swapped.
+        The modified quantum circuit with B1 and A† swapped at every site.
     """
-    B1_idx = B1_info["index"]
-    B1_qubits = B1_info["qubits"]
-    B1_gate = B1_info["gate"]
-    A = B1_info["A"]
-    shared_qubit = B1_info["shared_qubit"]
-    third_qubit = B1_info["third_qubit"]
-
-    # Map qubit indices to qubit objects.
-    qubit_map = {qc.find_bit(q).index: q for q in qc.qubits}
-
-    # Get the operators.
-    B1_operator = Operator(B1_gate)
-    A_operator = Operator(A)
-    A_dagger_operator = A_operator.adjoint()
-
-    # Determine the qubits involved.
-    qubits_involved = sorted(set(B1_qubits + [shared_qubit, third_qubit]))
-    qubits_involved_objs = [qubit_map[q] for q in qubits_involved]
-    num_qubits_involved = len(qubits_involved)
-
-    # Create mapping from qubit indices to positions.
-    qubit_positions = {q: idx for idx, q in enumerate(qubits_involved)}
-
-    # Build B1_operator_full.
-    B1_operator_full = Operator(np.eye(2**num_qubits_involved))
-    B1_qubit_positions = [qubit_positions[q] for q in B1_qubits]
-    B1_operator_full = B1_operator_full.compose(B1_operator, qargs=B1_qubit_positions)
+    # Group the sites by the positions of B1 and A† inside their three-qubit block.
+    layouts = [_conjugation_layout(B1_info) for B1_info in B1_infos]
+    groups: dict[tuple[tuple[int, ...], tuple[int, ...]], list[int]] = {}
+    for site, (_, B1_positions, A_dagger_positions) in enumerate(layouts):
+        groups.setdefault((tuple(B1_positions), tuple(A_dagger_positions)), []).append(site)
+
+    widetilde_A_daggers: list[np.ndarray] = [np.empty(0)] * len(B1_infos)
+    for layout, sites in groups.items():
+        batch = conjugate_unitaries(
+            np.stack([Operator(B1_infos[site]["gate"]).data for site in sites]),
+            np.stack([B1_infos[site]["A_dag"] for site in sites]),
+            *layout,
+        )
+        for site, widetilde_A_dagger in zip(sites, batch):
+            widetilde_A_daggers[site] = widetilde_A_dagger
+
+    new_qc = qc if inplace else qc.copy()
+    for B1_info, (qubits_involved, _, _), widetilde_A_dagger in zip(B1_infos, layouts, widetilde_A_daggers):
+        _replace_with_conjugated(new_qc, B1_info, widetilde_A_dagger, qubits_involved, index)
+    return new_qc
 
-    # Build A_dagger_operator_full.
-    A_dagger_operator_full = Operator(np.eye(2**num_qubits_involved))
-    A_dagger_qubits = [shared_qubit, third_qubit]
-    A_dagger_qubit_positions = [qubit_positions[q] for q in A_dagger_qubits]
-    A_dagger_operator_full = A_dagger_operator_full.compose(A_dagger_operator, qargs=A_dagger_qubit_positions)
 
-    # Compute B1_operator_full_dagger.
-    B1_operator_full_dagger = B1_operator_full.adjoint()
+def conjugate_unitaries(
+    B1: np.ndarray,
+    A_dagger: np.ndarray,
+    B1_positions: Sequence[int],
+    A_dagger_positions: Sequence[int],
+) -> np.ndarray:
+    r"""Compute \widetilde{A^\dagger} = B1^\dagger A^\dagger B1 on a three-qubit block with a single tensor contraction.
 
-    # Compute \widetilde{A^\dagger}.
-    widetilde_A_dagger_operator = B1_operator_full_dagger.dot(A_dagger_operator_full).dot(B1_operator_full)
+    The two-qubit matrices are reshaped into 2x2x2x2 tensors and contracted with `np.einsum`, so no 8x8 embeddings
+    are built. Leading dimensions are treated as a batch, which computes many conjugations in one call.
 
-    # Create UnitaryGate from \widetilde{A^\dagger}.
-    widetilde_A_dagger_gate = UnitaryGate(widetilde_A_dagger_operator.data, label=r"$\widetilde{A^{\dagger}}$")
+    Args:
+        B1: Matrix of B1 with shape (4, 4), or a stack of them with shape (..., 4, 4).
+        A_dagger: Matrix of A† with the same shape as `B1`.
+        B1_positions: Positions in the block of the qubits B1 acts on, in Qiskit's little-endian qubit order.
+        A_dagger_positions: Positions in the block of the qubits A† acts on.
 
-    # Create a new quantum circuit.
-    new_qc = QuantumCircuit(*qc.qregs, *qc.cregs)
+    Returns:
+        The matrix of \widetilde{A^\dagger} with shape (..., 8, 8).
+    """
+    B1 = np.asarray(B1, dtype=complex)
+    A_dagger = np.asarray(A_dagger, dtype=complex)
+    batch_shape = B1.shape[:-2]
+    B1_tensor = B1.reshape(*batch_shape, 2, 2, 2, 2)
+    A_dagger_tensor = A_dagger.reshape(*batch_shape, 2, 2, 2, 2)
+
+    # Index letters of each qubit line; every gate gives the lines it acts on fresh letters for its outputs.
+    letters = iter("defghijklmnopqrstuvwxyz")
+    inputs = ["a", "b", "c"]
+    lines = list(inputs)
+
+    def apply(positions: Sequence[int], adjoint: bool = False) -> str:
+        p0, p1 = positions
+        before = lines[p1] + lines[p0]
+        lines[p0], lines[p1] = next(letters), next(letters)
+        after = lines[p1] + lines[p0]
+        # The adjoint swaps the roles of the row and column indices of the conjugated tensor.
+        return "..." + (before + after if adjoint else after + before)
+
+    subscripts = [apply(B1_positions), apply(A_dagger_positions), apply(B1_positions, adjoint=True)]
+    operands = [B1_tensor, A_dagger_tensor, B1_tensor.conj()]
+
+    # A qubit line that no gate acts on carries the identity.
+    for position, letter in enumerate(inputs):
+        if lines[position] == letter:
+            lines[position] = next(letters)
+            subscripts.append(lines[position] + letter)
+            operands.append(np.eye(2))
+
+    # Searching for a contraction order only pays off for batches; a single 8x8 product is faster without it.
+    output = "..." + "".join(reversed(lines)) + "".join(reversed(inputs))
+    result = np.einsum(f"{','.join(subscripts)}->{output}", *operands, optimize=len(batch_shape) > 0)
+    return result.reshape(*batch_shape, 8, 8)
+
+
+def _conjugation_layout(B1_info: dict[str, Any]) -> tuple[list[int], list[int], list[int]]:
+    """Return the qubits of the three-qubit block of a site and the positions of B1 and A† within it."""
+    A_dagger_qubits = [B1_info["shared_qubit"], B1_info["third_qubit"]]
+    qubits_involved = sorted(set(B1_info["qubits"] + A_dagger_qubits))
+    qubit_positions = {q: idx for idx, q in enumerate(qubits_involved)}
+    B1_positions = [qubit_positions[q] for q in B1_info["qubits"]]
+    A_dagger_positions = [qubit_positions[q] for q in A_dagger_qubits]
+    return qubits_involved, B1_positions, A_dagger_positions
 
-    # Copy the gates up to B1_idx.
-    for i in range(B1_idx):
-        instruction = qc.data[i]
-        new_qc.append(instruction.operation, instruction.qubits, instruction.clbits)
 
-    # Insert \widetilde{A^\dagger} at position B1_idx.
-    new_qc.append(widetilde_A_dagger_gate, qubits_involved_objs)
+def _replace_with_conjugated(
+    qc: QuantumCircuit,
+    B1_info: dict[str, Any],
+    widetilde_A_dagger: np.ndarray,
+    qubits_involved: list[int],
+    index: TwoQubitGateIndex | None,
+) -> None:
+    r"""Replace B1, A† at a site of `qc` with \widetilde{A^\dagger}, B1 in place."""
+    B1_idx = B1_info["index"]
+    B1_instruction = qc.data[B1_idx]
 
-    # Insert B1 gate at position B1_idx + 1.
-    new_qc.append(B1_gate, [qubit_map[q] for q in B1_qubits])
+    # Create UnitaryGate from \widetilde{A^\dagger}.
+    widetilde_A_dagger_gate = UnitaryGate(widetilde_A_dagger, label=r"$\widetilde{A^{\dagger}}$", check_input=False)
 
-    # Copy the remaining gates, skipping the original A_dagger gate.
-    for i in range(B1_idx + 2, len(qc.data)):
-        instruction = qc.data[i]
-        new_qc.append(instruction.operation, instruction.qubits, instruction.clbits)
+    # Put \widetilde{A^\dagger} at position B1_idx and B1 at position B1_idx + 1, replacing the original A_dagger gate.
+    qubits_involved_objs = tuple(qc.qubits[q] for q in qubits_involved)
+    qc.data[B1_idx] = CircuitInstruction(widetilde_A_dagger_gate, qubits_involved_objs)
+    qc.data[B1_idx + 1] = B1_instruction
 
-    return new_qc
+    if index is not None:
+        index.splice(B1_idx, B1_idx + 2, [qubits_involved, B1_info["qubits"]])
 
 
 def decompose(qc: QuantumCircuit, method: str = "default") -> QuantumCircuit:
-    """Decompose multi-qubit unitary gates into elementary gates.
+    r"""Decompose multi-qubit unitary gates into elementary gates.
 
     Args:
         qc: The quantum circuit to decompose.
         method: The decomposition method to use. Options include:
                 - "default": Standard Qiskit decomposition.
                 - "kak": Perform KAK decomposition for two-qubit gates.
+                - "basis": Translate every gate to the `cx`/`u3` basis with the session equivalence library.
+                - "direct": Synthesize the recipe's `UnitaryGate`s straight into `cx`/`u3` gates: two-qubit ones
+                  with a KAK decomposition and the three-qubit \widetilde{A^\dagger} with a quantum Shannon
+                  decomposition. Other gates are left for `synthesize`.
 
     Returns:
         The decomposed quantum circuit.
@@ -282,10 +740,53 @@ def decompose(qc: QuantumCircuit, method: str = "default") -> QuantumCircuit:
         pass_manager.append(BasisTranslator(SessionEquivalenceLibrary, basis_gates))
         return pass_manager.run(qc)
 
+    elif method == "direct":
+        return _decompose_unitaries_directly(qc)
+
     else:
         raise ValueError(f"Unknown decomposition method: {method}")
 
 
+def _decompose_unitaries_directly(qc: QuantumCircuit) -> QuantumCircuit:
+    """Replace every multi-qubit `UnitaryGate` of `qc` with a `cx`/`u3` circuit from a cached synthesizer.
+
+    `UnitaryGate.definition` runs the same syntheses, but checks every three-qubit result against the target matrix,
+    which costs far more than the synthesis itself. The recipe only needs the result to be exact up to numerical
+    precision, which the tests check end to end.
+    """
+    two_qubit_decomposer = _two_qubit_decomposer()
+    one_qubit_decomposer = OneQubitEulerDecomposer("U3")
+    new_qc = qc.copy()
+
+    # Splice from the back so the positions of the remaining unitaries stay valid.
+    positions = [
+        idx
+        for idx, instruction in enumerate(qc.data)
+        if isinstance(instruction.operation, UnitaryGate) and instruction.operation.num_qubits >= 2
+    ]
+    for idx in reversed(positions):
+        instruction = new_qc.data[idx]
+        matrix = instruction.operation.to_matrix()
+        if len(instruction.qubits) == 2:
+            definition = two_qubit_decomposer(matrix)
+        else:
+            definition = qs_decomposition(
+                matrix, decomposer_1q=one_qubit_decomposer, decomposer_2q=two_qubit_decomposer
+            )
+        new_qc.global_phase += definition.global_phase
+        del new_qc.data[idx]
+        for offset, gate in enumerate(definition.data):
+            qubits = tuple(instruction.qubits[definition.find_bit(q).index] for q in gate.qubits)
+            new_qc.data.insert(idx + offset, gate.replace(qubits=qubits))
+    return new_qc
+
+
+@functools.cache
+def _two_qubit_decomposer() -> TwoQubitBasisDecomposer:
+    """Return the exact `cx`/`u3` KAK decomposer used by the "direct" decomposition method."""
+    return TwoQubitBasisDecomposer(CXGate(), euler_basis="U3")
+
+
 def synthesize(qc: QuantumCircuit, optimization_level: int = 3) -> QuantumCircuit:
     """Synthesize the circuit using a specified optimization level.
 
@@ -296,4 +797,84 @@ def synthesize(qc: QuantumCircuit, optimization_level: int = 3) -> QuantumCircui
     Returns:
         The synthesized quantum circuit.
     """
-    return transpile(qc, optimization_level=optimization_level, basis_gates=["cx", "u3"])
+    return _synthesis_pass_manager(optimization_level).run(qc)
+
+
+def synthesize_window(
+    qc: QuantumCircuit,
+    start: int,
+    stop: int,
+    decomposition_method: str = "default",
+    optimization_level: int = 3,
+    index: TwoQubitGateIndex | None = None,
+    inplace: bool = False,
+) -> QuantumCircuit:
+    """Decompose and synthesize only the instructions `qc.data[start:stop]`.
+
+    The window is copied into a circuit on just the qubits it touches, decomposed, transpiled into the `cx`/`u3`
+    basis and spliced back in place of the original instructions. The rest of the circuit is left untouched, so the
+    cost does not grow with circuit size.
+
+    Args:
+        qc: The quantum circuit to resynthesize.
+        start: Index of the first instruction of the window.
+        stop: Index one past the last instruction of the window.
+        decomposition_method: The decomposition method passed to `decompose`.
+        optimization_level: The optimization level for transpilation.
+        index: The two-qubit gate index of `qc`, updated in place to describe the returned circuit.
+        inplace: If True, splice the synthesized window into `qc` itself instead of a copy.
+
+    Returns:
+        The quantum circuit with the window resynthesized.
+    """
+    window = qc.data[start:stop]
+    if any(instruction.clbits for instruction in window):
+        raise ValueError("Only windows of purely quantum instructions can be resynthesized.")
+
+    # Copy the window onto the qubits it touches, in circuit order.
+    window_qubits = sorted({qc.find_bit(q).index for instruction in window for q in instruction.qubits})
+    local_qubits = {q: idx for idx, q in enumerate(window_qubits)}
+    window_qc = QuantumCircuit(len(window_qubits))
+    for instruction in window:
+        window_qc.append(instruction.operation, [local_qubits[qc.find_bit(q).index] for q in instruction.qubits])
+
+    window_qc = synthesize(decompose(window_qc, method=decomposition_method), optimization_level=optimization_level)
+
+    # Edit a copy of the circuit unless asked to work in place.
+    new_qc = qc if inplace else qc.copy()
+    new_qc.global_phase += window_qc.global_phase
+
+    # Replace the window with the synthesized instructions, mapped back onto the circuit's qubits.
+    del new_qc.data[start:stop]
+    new_qubits = []
+    for offset, instruction in enumerate(window_qc.data):
+        qubits = [window_qubits[window_qc.find_bit(q).index] for q in instruction.qubits]
+        new_qc.data.insert(start + offset, instruction.replace(qubits=tuple(new_qc.qubits[q] for q in qubits)))
+        new_qubits.append(qubits)
+
+    if index is not None:
+        index.splice(start, stop, new_qubits)
+
+    return new_qc
+
+
+@functools.cache
+def _synthesis_pass_manager(optimization_level: int) -> PassManager:
+    """Build the `cx`/`u3` preset pass manager used by `synthesize`, without virtual qubit permutations.
+
+    At optimization levels 2 and 3 the preset init stage elides SWAP gates (and splits SWAP-equivalent two-qubit
+    unitaries) into a final permutation that is only recorded in the output circuit's layout. The recipe keeps editing
+    the synthesized circuit and does not carry that layout forward, so those passes are left out or told not to split
+    SWAPs. The pass manager is built once per optimization level.
+    """
+    pass_manager = generate_preset_pass_manager(optimization_level=optimization_level, basis_gates=["cx", "u3"])
+    if pass_manager.init is not None:
+        init_passes = []
+        for task in pass_manager.init.to_flow_controller().tasks:
+            if isinstance(task, ElidePermutations):
+                continue
+            if isinstance(task, Split2QUnitaries):
+                task = Split2QUnitaries(fidelity=task.requested_fidelity, split_swap=False)
+            init_passes.append(task)
+        pass_manager.init = PassManager(init_passes)
+    return pass_manager
@@ -0,0 +1,93 @@
+"""Seeded sampling of the random gates used by the unoptimization recipe."""
+
+import numpy as np
+
+
+def as_generator(seed: int | np.random.Generator | None = None) -> np.random.Generator:
+    """Return a NumPy random generator for a seed.
+
+    Args:
+        seed: An integer seed, an existing generator (returned unchanged), or None for fresh OS entropy.
+
+    Returns:
+        The random generator.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_generators(seed: int | np.random.Generator | None, num: int) -> list[np.random.Generator]:
+    """Derive independent random generators, e.g. one per parallel worker or per trial.
+
+    The streams are spawned from a single `SeedSequence`, so they do not overlap and the same seed always yields the
+    same list of generators.
+
+    Args:
+        seed: The master seed, a generator to draw the master seed from, or None for fresh OS entropy.
+        num: The number of generators to derive.
+
+    Returns:
+        The list of independent generators.
+    """
+    if isinstance(seed, np.random.Generator):
+        seed_sequence = np.random.SeedSequence(seed.integers(2**63, size=4).tolist())
+    else:
+        seed_sequence = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed_sequence.spawn(num)]
+
+
+def haar_random_unitaries(num: int, dim: int = 4, seed: int | np.random.Generator | None = None) -> np.ndarray:
+    """Sample a batch of Haar-random unitary matrices.
+
+    Uses the QR decomposition of complex Gaussian matrices with the phases of the diagonal of R divided out, as in
+    Mezzadri, "How to generate random matrices from the classical compact groups" (arXiv:math-ph/0609050). The whole
+    batch is factored with a single stacked `np.linalg.qr` call.
+
+    Args:
+        num: The number of unitaries to sample.
+        dim: The dimension of each unitary (4 for two-qubit gates).
+        seed: The seed or generator to draw from.
+
+    Returns:
+        An array of shape (num, dim, dim) of unitary matrices.
+    """
+    rng = as_generator(seed)
+    z = (rng.standard_normal((num, dim, dim)) + 1j * rng.standard_normal((num, dim, dim))) / np.sqrt(2)
+    q, r = np.linalg.qr(z)
+    diagonal = np.diagonal(r, axis1=-2, axis2=-1)
+    return q * (diagonal / np.abs(diagonal))[:, np.newaxis, :]
+
+
+class UnitaryPool:
+    """Reusable pool of pre-generated Haar-random unitaries.
+
+    Unitaries are sampled in batches of `size` with `haar_random_unitaries` and handed out one at a time, so the cost
+    of sampling is paid once per batch rather than once per inserted gate.
+
+    Args:
+        seed: The seed or generator the pool draws from. The generator is also exposed as `rng` for other random
+            choices that should share the same reproducible stream.
+        dim: The dimension of the unitaries.
+        size: The number of unitaries generated per refill.
+    """
+
+    def __init__(self, seed: int | np.random.Generator | None = None, dim: int = 4, size: int = 64) -> None:
+        self.rng = as_generator(seed)
+        self.dim = dim
+        self.size = size
+        self._unitaries = np.empty((0, dim, dim), dtype=complex)
+        self._next = 0
+
+    def draw(self) -> np.ndarray:
+        """Return the next unitary of the pool, refilling it when exhausted.
+
+        Returns:
+            A Haar-random unitary matrix of shape (dim, dim).
+        """
+        if self._next == len(self._unitaries):
+            self._unitaries = haar_random_unitaries(self.size, self.dim, self.rng)
+            self._next = 0
+        unitary = self._unitaries[self._next]
+        self._next += 1
+        return unitary
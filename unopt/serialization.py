@@ -0,0 +1,32 @@
+"""Compact serialization of quantum circuits with QPY."""
+
+import io
+
+from qiskit import QuantumCircuit, qpy
+
+
+def dump_circuit(qc: QuantumCircuit) -> bytes:
+    """Serialize a quantum circuit to QPY bytes.
+
+    Args:
+        qc: The quantum circuit to serialize.
+
+    Returns:
+        The QPY payload.
+    """
+    buffer = io.BytesIO()
+    qpy.dump(qc, buffer)
+    return buffer.getvalue()
+
+
+def load_circuit(payload: bytes) -> QuantumCircuit:
+    """Deserialize a quantum circuit from QPY bytes produced by `dump_circuit`.
+
+    Args:
+        payload: The QPY payload.
+
+    Returns:
+        The quantum circuit.
+    """
+    (qc,) = qpy.load(io.BytesIO(payload))
+    return qc
@@ -0,0 +1,233 @@
+"""Pool of reusable Aer simulators."""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit_aer import AerSimulator
+from qiskit_aer.noise import NoiseModel
+
+
+def noise_model_fingerprint(noise_model: NoiseModel | None) -> str:
+    """Return a hash of the errors and basis gates of a noise model.
+
+    Args:
+        noise_model: The noise model to hash, or None for no noise.
+
+    Returns:
+        The hex digest of the noise model's serialized form, or "none" without a noise model.
+    """
+    if noise_model is None:
+        return "none"
+    # Every error carries a random id, which would make equal noise models hash differently.
+    errors = [
+        {name: value for name, value in error.items() if name != "id"}
+        for error in noise_model.to_dict(serializable=True)["errors"]
+    ]
+    description = {"basis_gates": sorted(noise_model.basis_gates), "errors": errors}
+    return hashlib.sha256(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+class SimulatorPool:
+    """Thread-safe, size-bounded cache of `AerSimulator` instances.
+
+    Simulators are keyed by method, noise model fingerprint (see `noise_model_fingerprint`) and the other simulator
+    options, so equal noise models built separately share a simulator. Reusing a simulator avoids rebuilding its
+    target, which `transpile` otherwise does for every new instance. Once the pool holds `max_size` simulators, the
+    least recently used one is dropped.
+
+    Pooled simulators are shared: pass per-job settings as run options, e.g. `backend.run(circuits, shots=shots)`, and
+    never call `set_options` on them.
+
+    Args:
+        max_size: The maximum number of simulators to keep.
+
+    Attributes:
+        hits: The number of requests served by a pooled simulator.
+        misses: The number of simulators created.
+    """
+
+    def __init__(self, max_size: int = 16) -> None:
+        if max_size < 1:
+            raise ValueError(f"The pool size must be at least 1, got {max_size}.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._simulators: OrderedDict[tuple[str, str, str], AerSimulator] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, method: str = "automatic", noise_model: NoiseModel | None = None, **options: Any) -> AerSimulator:
+        """Return a simulator with the given method, noise model and options, creating it if needed.
+
+        Args:
+            method: The Aer simulation method.
+            noise_model: The noise model to simulate, if any.
+            **options: Other `AerSimulator` options, e.g. `seed_simulator`.
+
+        Returns:
+            The pooled simulator.
+        """
+        key = (method, noise_model_fingerprint(noise_model), repr(sorted(options.items())))
+        with self._lock:
+            simulator = self._simulators.get(key)
+            if simulator is not None:
+                self.hits += 1
+                self._simulators.move_to_end(key)
+                return simulator
+
+            self.misses += 1
+            simulator = AerSimulator(method=method, noise_model=noise_model, **options)
+            self._simulators[key] = simulator
+            if len(self._simulators) > self.max_size:
+                self._simulators.popitem(last=False)
+            return simulator
+
+    def clear(self) -> None:
+        """Drop every pooled simulator and reset the counters."""
+        with self._lock:
+            self._simulators.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._simulators)
+
+
+_default_pool = SimulatorPool()
+
+
+def get_simulator(method: str = "automatic", noise_model: NoiseModel | None = None, **options: Any) -> AerSimulator:
+    """Return a simulator from the module's default `SimulatorPool`.
+
+    Args:
+        method: The Aer simulation method.
+        noise_model: The noise model to simulate, if any.
+        **options: Other `AerSimulator` options.
+
+    Returns:
+        The pooled simulator.
+    """
+    return _default_pool.get(method, noise_model, **options)
+
+
+# Gates that map stabilizer states to stabilizer states.
+CLIFFORD_GATES = frozenset(
+    ["id", "x", "y", "z", "h", "s", "sdg", "sx", "sxdg", "cx", "cy", "cz", "swap", "ecr", "iswap", "dcx"]
+)
+# Two-qubit gates of operator Schmidt rank 2, which at most double the bond dimension of a matrix product state.
+_RANK_TWO_GATES = frozenset(["cx", "cy", "cz", "ch", "cp", "crx", "cry", "crz", "cu1", "rzz", "rxx", "ryy", "rzx"])
+_NON_GATES = frozenset(["barrier", "measure", "reset", "delay"])
+
+# Below this many qubits the statevector method is fast enough that matrix product states do not pay off.
+MPS_MIN_QUBITS = 16
+# Largest bond dimension bound, as a power of two, for which a circuit counts as weakly entangled.
+MPS_MAX_LOG2_BOND_DIMENSION = 8
+# Largest noisy circuit that is sampled from one density matrix rather than one statevector trajectory per shot.
+DENSITY_MATRIX_MAX_QUBITS = 10
+# Largest circuit the statevector method is used for, 256 MiB of amplitudes.
+STATEVECTOR_MAX_QUBITS = 24
+
+SIMULATION_METHODS = ("statevector", "density_matrix", "matrix_product_state", "stabilizer")
+
+
+@dataclass
+class MethodChoice:
+    """The simulation method chosen by `select_method`, with the reason for the choice."""
+
+    method: str
+    reason: str
+
+
+def select_method(
+    circuits: QuantumCircuit | Sequence[QuantumCircuit],
+    noise_model: NoiseModel | None = None,
+    shots: int | None = None,
+    method: str = "auto",
+) -> MethodChoice:
+    """Choose the Aer simulation method for a batch of circuits.
+
+    The choice considers, in order:
+    - Clifford circuits without noise, or with Pauli noise when sampling, use "stabilizer".
+    - Weakly entangled circuits use "matrix_product_state" from `MPS_MIN_QUBITS` qubits without noise, and beyond
+      `STATEVECTOR_MAX_QUBITS` with noise. The entanglement is bounded by counting, for every cut of the qubit line,
+      the two-qubit gates acting across it; see `max_log2_bond_dimension`.
+    - Exact values of noisy circuits (`shots` of None) need "density_matrix". So does sampling a noisy circuit of up
+      to `DENSITY_MATRIX_MAX_QUBITS` qubits with at least 2^n shots, which is cheaper than one trajectory per shot.
+    - Everything else uses "statevector".
+
+    Args:
+        circuits: The circuit, or the circuits of a batch, which then share the method.
+        noise_model: The noise model to simulate, if any.
+        shots: The number of shots, or None for an exact, shot-noise-free evaluation.
+        method: "auto" to choose, or the method to use regardless, which is reported as an override.
+
+    Returns:
+        The chosen method and the reason for the choice.
+    """
+    if method != "auto":
+        if method not in (*SIMULATION_METHODS, "automatic"):
+            raise ValueError(f"Unknown method '{method}'. Available methods are 'auto', {SIMULATION_METHODS}.")
+        return MethodChoice(method, "override")
+
+    if isinstance(circuits, QuantumCircuit):
+        circuits = [circuits]
+    num_qubits = max((qc.num_qubits for qc in circuits), default=0)
+    noisy = noise_model is not None and not noise_model.is_ideal()
+    clifford = all(instruction.operation.name in CLIFFORD_GATES | _NON_GATES for qc in circuits for instruction in qc)
+    log2_bond = max((max_log2_bond_dimension(qc) for qc in circuits), default=0)
+    weakly_entangled = log2_bond <= MPS_MAX_LOG2_BOND_DIMENSION
+
+    if clifford and (not noisy or (shots is not None and _is_pauli_noise(noise_model))):
+        return MethodChoice("stabilizer", "Clifford circuit" + (" with Pauli noise" if noisy else ""))
+    if noisy and shots is None:
+        return MethodChoice("density_matrix", "exact noisy evaluation")
+    if weakly_entangled and num_qubits >= (STATEVECTOR_MAX_QUBITS + 1 if noisy else MPS_MIN_QUBITS):
+        return MethodChoice("matrix_product_state", f"weak entanglement, bond dimension at most 2^{log2_bond}")
+    if noisy and shots is not None and num_qubits <= DENSITY_MATRIX_MAX_QUBITS and shots >= 2**num_qubits:
+        return MethodChoice("density_matrix", "small noisy circuit with many shots")
+    return MethodChoice("statevector", "default")
+
+
+def max_log2_bond_dimension(qc: QuantumCircuit) -> int:
+    """Return an upper bound on log2 of the largest bond dimension of a matrix product state simulation of `qc`.
+
+    Every two-qubit gate multiplies the Schmidt rank across each cut of the qubit line that it spans by at most its
+    operator Schmidt rank: 2 for controlled and two-qubit rotation gates and 4 otherwise. The rank across a cut is
+    also at most 2^k for k qubits on the smaller side of the cut. Gates on more than two qubits count as generic.
+
+    Args:
+        qc: The quantum circuit.
+
+    Returns:
+        The bound on log2 of the bond dimension, over all cuts.
+    """
+    num_qubits = qc.num_qubits
+    if num_qubits < 2:
+        return 0
+    crossings = np.zeros(num_qubits - 1, dtype=int)
+    for instruction in qc.data:
+        if len(instruction.qubits) < 2 or instruction.operation.name in _NON_GATES:
+            continue
+        indices = [qc.find_bit(qubit).index for qubit in instruction.qubits]
+        crossings[min(indices) : max(indices)] += 1 if instruction.operation.name in _RANK_TWO_GATES else 2
+    side = np.minimum(np.arange(1, num_qubits), np.arange(num_qubits - 1, 0, -1))
+    return int(np.max(np.minimum(crossings, side)))
+
+
+def _is_pauli_noise(noise_model: NoiseModel | None) -> bool:
+    """Return whether every error of a noise model is a mixture of Pauli operators."""
+    if noise_model is None:
+        return True
+    for error in noise_model.to_dict()["errors"]:
+        if error["type"] != "qerror":
+            return False
+        for instructions in error["instructions"]:
+            if any(op["name"] not in ("id", "x", "y", "z", "pauli") for op in instructions):
+                return False
+    return True
@@ -0,0 +1,122 @@
+"""Append-only, columnar on-disk store of benchmark trials."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# Bump when the layout of the stored files changes.
+STORE_FORMAT_VERSION = 1
+
+
+class BenchStore:
+    """Directory of benchmark trials, written in chunks as they complete so that an interrupted run can resume.
+
+    The directory holds:
+    - "metadata.json": the configuration of the run, which a resumed run must match, and run-level values.
+    - "chunk-NNNNNN.npz": one file per chunk of trials, with one array per column (scalar columns are 1-D, list
+      columns such as circuit depths are 2-D with one row per trial). Chunks are written atomically, so a crash loses
+      at most the trials of the chunk being filled.
+    - "density_matrix.npy": the optional density matrix, read back as a memory-mapped array.
+
+    Args:
+        directory: The store directory, created if needed.
+        chunk_size: The number of trials buffered before a chunk is written.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], chunk_size: int = 1) -> None:
+        if chunk_size < 1:
+            raise ValueError(f"The chunk size must be at least 1, got {chunk_size}.")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self._buffer: list[dict[str, Any]] = []
+
+    @property
+    def metadata_path(self) -> Path:
+        return self.directory / "metadata.json"
+
+    @property
+    def density_matrix_path(self) -> Path:
+        return self.directory / "density_matrix.npy"
+
+    def open(self, config: dict[str, Any], metadata: dict[str, Any] | None = None) -> None:
+        """Start a new run, or check that an existing run has the same configuration.
+
+        Args:
+            config: The JSON-serializable parameters that determine the trials. Resuming with different parameters
+                raises a ValueError.
+            metadata: Further JSON-serializable values to record for the run, e.g. the ideal value.
+        """
+        if self.metadata_path.exists():
+            stored = self.read_metadata()
+            if stored["config"] != json.loads(json.dumps(config)):
+                raise ValueError(f"The store at {self.directory} holds a run with a different configuration.")
+            return
+        document = {"format": STORE_FORMAT_VERSION, "config": config, "metadata": metadata or {}}
+        self._write_atomically(self.metadata_path, json.dumps(document, indent=2, sort_keys=True).encode())
+
+    def read_metadata(self) -> dict[str, Any]:
+        """Return the stored document with "format", "config" and "metadata"."""
+        document = json.loads(self.metadata_path.read_text())
+        if document["format"] != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported store format {document['format']} at {self.directory}.")
+        return document
+
+    def completed_trials(self) -> set[int]:
+        """Return the trial numbers of the trials already written."""
+        columns = self.read_columns()
+        return set(columns["trial_number"].tolist()) if columns else set()
+
+    def append(self, row: dict[str, Any]) -> None:
+        """Buffer one trial, given as a dict of column values including "trial_number", and write full chunks."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered trials as a new chunk."""
+        if not self._buffer:
+            return
+        columns = {name: np.asarray([row[name] for row in self._buffer]) for name in self._buffer[0]}
+        index = len(list(self.directory.glob("chunk-*.npz")))
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as handle:
+            np.savez(handle, allow_pickle=False, **columns)
+        os.replace(handle.name, self.directory / f"chunk-{index:06d}.npz")
+        self._buffer.clear()
+
+    def read_columns(self) -> dict[str, np.ndarray]:
+        """Return every written trial as a dict of columns, sorted by trial number, or an empty dict if none."""
+        chunks = []
+        for path in sorted(self.directory.glob("chunk-*.npz")):
+            with np.load(path, allow_pickle=False) as chunk:
+                chunks.append({name: chunk[name] for name in chunk.files})
+        if not chunks:
+            return {}
+        columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+        # A trial written twice, e.g. by two runs racing on one store, is kept once.
+        _, first = np.unique(columns["trial_number"], return_index=True)
+        return {name: column[first] for name, column in columns.items()}
+
+    def write_density_matrix(self, density_matrix: np.ndarray) -> None:
+        """Write the density matrix of the run, unless it is already stored."""
+        if self.density_matrix_path.exists():
+            return
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as handle:
+            np.save(handle, density_matrix, allow_pickle=False)
+        os.replace(handle.name, self.density_matrix_path)
+
+    def read_density_matrix(self) -> np.ndarray | None:
+        """Return the density matrix as a read-only memory-mapped array, or None if none is stored."""
+        if not self.density_matrix_path.exists():
+            return None
+        return np.load(self.density_matrix_path, mmap_mode="r")
+
+    def _write_atomically(self, path: Path, payload: bytes) -> None:
+        """Write a file through a temporary file, so that readers never see it half-written."""
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as handle:
+            handle.write(payload)
+        os.replace(handle.name, path)
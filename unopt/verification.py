@@ -0,0 +1,96 @@
+"""Randomized equivalence checks of unoptimized circuits."""
+
+from dataclasses import dataclass
+
+import numpy as np
+from qiskit import QuantumCircuit, transpile
+from qiskit.circuit.library import UnitaryGate
+
+from unopt.sampling import as_generator, haar_random_unitaries
+from unopt.simulators import get_simulator
+
+# The six single-qubit stabilizer states, prepared from |0> by these gate sequences.
+_STABILIZER_PREPARATIONS = [[], ["x"], ["h"], ["x", "h"], ["h", "s"], ["x", "h", "s"]]
+
+
+@dataclass
+class EquivalenceResult:
+    """Outcome of `verify_equivalence`.
+
+    The overlaps are <psi| U^dagger V |psi> for the original circuit U, the unoptimized circuit V and every sampled
+    input state |psi>. For equivalent circuits they all equal the same global phase.
+    """
+
+    equivalent: bool
+    overlaps: np.ndarray
+
+    def __bool__(self) -> bool:
+        return self.equivalent
+
+
+def verify_equivalence(
+    original: QuantumCircuit,
+    unoptimized: QuantumCircuit,
+    samples: int = 8,
+    states: str = "product",
+    method: str = "statevector",
+    atol: float = 1e-6,
+    seed: int | np.random.Generator | None = None,
+) -> EquivalenceResult:
+    """Check that two circuits implement the same unitary, up to global phase, on random input states.
+
+    For each sampled product state |psi> = P|0>, the circuit P, V, U^dagger, P^dagger is simulated and the amplitude of
+    |0...0> is read out; it equals <psi| U^dagger V |psi>. The circuits are accepted if every overlap has modulus 1 and
+    all overlaps share the same phase, within `atol`. This never needs the 2^n x 2^n operator, and with the matrix
+    product state method it scales to circuits far beyond the reach of `Operator`.
+
+    A single Haar-random product state exposes any non-equivalent circuit with probability one, so a few samples guard
+    against unlucky near-eigenstates and numerical noise; more samples give more confidence. Random stabilizer
+    product states are cheaper to prepare but only probe a finite set of inputs, so they may need more samples.
+
+    Args:
+        original: The original quantum circuit U. Final measurements are ignored.
+        unoptimized: The unoptimized quantum circuit V, on the same qubits. Final measurements are ignored.
+        samples: The number of random input states.
+        states: The input states: "product" for Haar-random single-qubit states or "stabilizer" for random
+            single-qubit stabilizer states.
+        method: The Aer simulation method: "statevector" or "matrix_product_state".
+        atol: The absolute tolerance on the moduli and phases of the overlaps.
+        seed: Seed or generator for the input states.
+
+    Returns:
+        The result, which is truthy if the circuits were found equivalent.
+    """
+    if original.num_qubits != unoptimized.num_qubits:
+        raise ValueError("The circuits act on different numbers of qubits.")
+    if states not in ("product", "stabilizer"):
+        raise ValueError(f"Unknown input states '{states}'. Available states are 'product' and 'stabilizer'.")
+    if method not in ("statevector", "matrix_product_state"):
+        raise ValueError(f"Unknown method '{method}'. Available methods are 'statevector' and 'matrix_product_state'.")
+
+    num_qubits = original.num_qubits
+    rng = as_generator(seed)
+    original_inverse = original.remove_final_measurements(inplace=False).inverse()
+    unoptimized = unoptimized.remove_final_measurements(inplace=False)
+
+    circuits = []
+    for _ in range(samples):
+        preparation = QuantumCircuit(num_qubits)
+        if states == "product":
+            for qubit, unitary in enumerate(haar_random_unitaries(num_qubits, dim=2, seed=rng)):
+                preparation.append(UnitaryGate(unitary, check_input=False), [qubit])
+        else:
+            for qubit, choice in enumerate(rng.integers(len(_STABILIZER_PREPARATIONS), size=num_qubits)):
+                for gate in _STABILIZER_PREPARATIONS[choice]:
+                    getattr(preparation, gate)(qubit)
+
+        circuit = preparation.compose(unoptimized).compose(original_inverse).compose(preparation.inverse())
+        circuit.save_amplitudes([0])
+        circuits.append(circuit)
+
+    backend = get_simulator(method=method)
+    result = backend.run(transpile(circuits, backend, optimization_level=0), shots=1).result()
+    overlaps = np.array([result.data(idx)["amplitudes"][0] for idx in range(samples)], dtype=complex)
+
+    equivalent = bool(np.all(np.abs(np.abs(overlaps) - 1) <= atol) and np.all(np.abs(overlaps - overlaps[0]) <= atol))
+    return EquivalenceResult(equivalent=equivalent, overlaps=overlaps)